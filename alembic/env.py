@@ -2,7 +2,7 @@ from logging.config import fileConfig
 from database import Base
 from sqlalchemy import engine_from_config
 from sqlalchemy import pool
-from models import model_product, model_category, model_user
+from models import model_product, model_category, model_user, model_cart, model_order
 
 from alembic import context
 
@@ -0,0 +1,32 @@
+"""export updated_at
+
+Revision ID: 3b7e0c5a9d16
+Revises: c61f0b84d2e9
+Create Date: 2026-10-18 19:52:40.518203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b7e0c5a9d16'
+down_revision: Union[str, None] = 'c61f0b84d2e9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    for table in ('comments', 'ratings', 'cart_items'):
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(), server_default=sa.func.now(), nullable=False))
+        op.create_index(f'ix_{table}_updated_at', table, ['updated_at'])
+
+    op.execute('UPDATE comments SET updated_at = post_date')
+
+
+def downgrade() -> None:
+    for table in ('cart_items', 'ratings', 'comments'):
+        op.drop_index(f'ix_{table}_updated_at', table_name=table)
+        op.drop_column(table, 'updated_at')
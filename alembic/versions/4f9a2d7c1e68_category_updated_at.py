@@ -0,0 +1,26 @@
+"""category updated_at
+
+Revision ID: 4f9a2d7c1e68
+Revises: 8e4c1b6f2d90
+Create Date: 2026-10-18 22:31:07.640215
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4f9a2d7c1e68'
+down_revision: Union[str, None] = '8e4c1b6f2d90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('categories', sa.Column('updated_at', sa.DateTime(), server_default=sa.text("timezone('utc', now())"), nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('categories', 'updated_at')
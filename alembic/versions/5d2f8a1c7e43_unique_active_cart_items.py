@@ -0,0 +1,40 @@
+"""unique active cart items
+
+Revision ID: 5d2f8a1c7e43
+Revises: 3b7e0c5a9d16
+Create Date: 2026-10-18 21:12:05.384120
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d2f8a1c7e43'
+down_revision: Union[str, None] = '3b7e0c5a9d16'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute('''
+        UPDATE cart_items SET quantity = (
+            SELECT SUM(duplicate.quantity) FROM cart_items duplicate
+            WHERE duplicate.cart_id = cart_items.cart_id AND duplicate.product_id = cart_items.product_id AND duplicate.is_active = true
+        )
+        WHERE id IN (SELECT MIN(id) FROM cart_items WHERE is_active = true GROUP BY cart_id, product_id HAVING COUNT(*) > 1)
+    ''')
+    op.execute('''
+        UPDATE cart_items SET quantity = 0, is_active = false
+        WHERE is_active = true AND id NOT IN (SELECT MIN(id) FROM cart_items WHERE is_active = true GROUP BY cart_id, product_id)
+    ''')
+
+    op.drop_index('ix_cart_items_cart_product', table_name='cart_items')
+    op.create_index('ux_cart_items_cart_product_active', 'cart_items', ['cart_id', 'product_id'], unique=True, postgresql_where=sa.text('is_active = true'))
+
+
+def downgrade() -> None:
+    op.drop_index('ux_cart_items_cart_product_active', table_name='cart_items')
+    op.create_index('ix_cart_items_cart_product', 'cart_items', ['cart_id', 'product_id'], postgresql_where=sa.text('is_active = true'))
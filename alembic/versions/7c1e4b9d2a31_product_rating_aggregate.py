@@ -0,0 +1,56 @@
+"""product rating aggregate
+
+Revision ID: 7c1e4b9d2a31
+Revises: 2566a1eba0fb
+Create Date: 2026-10-18 19:02:11.418903
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c1e4b9d2a31'
+down_revision: Union[str, None] = '2566a1eba0fb'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('products', sa.Column('rating_sum', sa.Integer(), server_default='0', nullable=True))
+    op.add_column('products', sa.Column('rating_count', sa.Integer(), server_default='0', nullable=True))
+
+    op.execute(
+        """
+        UPDATE products SET
+            rating_sum = COALESCE(aggregate.rating_sum, 0),
+            rating_count = COALESCE(aggregate.rating_count, 0),
+            rating = aggregate.rating
+        FROM (
+            SELECT product_id, SUM(rating) AS rating_sum, COUNT(*) AS rating_count, AVG(rating) AS rating
+            FROM ratings
+            WHERE is_active = true
+            GROUP BY product_id
+        ) AS aggregate
+        WHERE aggregate.product_id = products.id
+        """
+    )
+    op.execute(
+        """
+        UPDATE products SET
+            rating_sum = 0,
+            rating_count = 0,
+            rating = NULL
+        WHERE NOT EXISTS (
+            SELECT 1 FROM ratings
+            WHERE ratings.product_id = products.id AND ratings.is_active = true
+        )
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('products', 'rating_count')
+    op.drop_column('products', 'rating_sum')
@@ -0,0 +1,44 @@
+"""utc server timestamps
+
+Revision ID: 8e4c1b6f2d90
+Revises: 5d2f8a1c7e43
+Create Date: 2026-10-18 21:40:18.227931
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8e4c1b6f2d90'
+down_revision: Union[str, None] = '5d2f8a1c7e43'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+TIMESTAMP_COLUMNS = (
+    ('carts', 'date_added'),
+    ('orders', 'date_created'),
+    ('users', 'created_at'),
+    ('users', 'updated_at'),
+    ('products', 'created_at'),
+    ('products', 'updated_at'),
+    ('comments', 'post_date'),
+    ('comments', 'updated_at'),
+    ('ratings', 'updated_at'),
+    ('cart_items', 'updated_at'),
+)
+
+
+def upgrade() -> None:
+    for table, column in TIMESTAMP_COLUMNS:
+        op.alter_column(table, column, existing_type=sa.DateTime(), server_default=sa.text("timezone('utc', now())"))
+        op.execute(f"UPDATE {table} SET {column} = ({column} AT TIME ZONE current_setting('TimeZone')) AT TIME ZONE 'UTC'")
+
+
+def downgrade() -> None:
+    for table, column in TIMESTAMP_COLUMNS:
+        op.execute(f"UPDATE {table} SET {column} = ({column} AT TIME ZONE 'UTC') AT TIME ZONE current_setting('TimeZone')")
+        op.alter_column(table, column, existing_type=sa.DateTime(), server_default=sa.func.now())
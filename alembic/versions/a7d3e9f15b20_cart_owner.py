@@ -0,0 +1,45 @@
+"""cart owner
+
+Revision ID: a7d3e9f15b20
+Revises: f2a8c6d41b97
+Create Date: 2026-10-18 21:24:40.518337
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7d3e9f15b20'
+down_revision: Union[str, None] = 'f2a8c6d41b97'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('carts', sa.Column('user_id', sa.Integer(), nullable=True))
+    op.create_foreign_key('fk_carts_user_id_users', 'carts', 'users', ['user_id'], ['id'])
+    op.execute('UPDATE carts SET user_id = (SELECT min(cart_items.user_id) FROM cart_items WHERE cart_items.cart_id = carts.id)')
+    op.execute("""
+        UPDATE cart_items SET cart_id = (
+            SELECT max(carts.id) FROM carts WHERE carts.user_id = cart_items.user_id AND carts.is_active = true
+        )
+        WHERE cart_items.is_active = true
+          AND cart_items.cart_id IN (SELECT carts.id FROM carts WHERE carts.is_active = true)
+    """)
+    op.execute("""
+        UPDATE carts SET is_active = false
+        WHERE carts.is_active = true
+          AND carts.id NOT IN (SELECT max(latest.id) FROM carts AS latest WHERE latest.is_active = true GROUP BY latest.user_id)
+    """)
+    op.create_index('ix_carts_user_id', 'carts', ['user_id'])
+    op.create_index('ux_carts_user_active', 'carts', ['user_id'], unique=True, postgresql_where=sa.text('is_active = true'))
+
+
+def downgrade() -> None:
+    op.drop_index('ux_carts_user_active', table_name='carts')
+    op.drop_index('ix_carts_user_id', table_name='carts')
+    op.drop_constraint('fk_carts_user_id_users', 'carts', type_='foreignkey')
+    op.drop_column('carts', 'user_id')
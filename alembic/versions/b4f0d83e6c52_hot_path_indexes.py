@@ -0,0 +1,45 @@
+"""hot path indexes
+
+Revision ID: b4f0d83e6c52
+Revises: 7c1e4b9d2a31
+Create Date: 2026-10-18 19:24:37.102614
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b4f0d83e6c52'
+down_revision: Union[str, None] = '7c1e4b9d2a31'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+AVAILABLE_PRODUCTS = sa.text('is_active = true AND stock > 0')
+
+
+def upgrade() -> None:
+    op.create_index('ix_products_available_id', 'products', ['id'], postgresql_where=AVAILABLE_PRODUCTS)
+    op.create_index('ix_products_available_category_id', 'products', ['category_id', 'id'], postgresql_where=AVAILABLE_PRODUCTS)
+    op.create_index('ix_products_available_supplier_id', 'products', ['supplier_id', 'id'], postgresql_where=AVAILABLE_PRODUCTS)
+    op.create_index('ix_comments_product_active_post_date', 'comments', ['product_id', 'is_active', 'post_date'])
+    op.create_index('ix_comments_product_user_root', 'comments', ['product_id', 'user_id'], postgresql_where=sa.text('parent_id IS NULL AND is_active = true'))
+    op.create_index('ix_ratings_product_active', 'ratings', ['product_id', 'is_active'])
+    op.create_index('ix_ratings_comment_id', 'ratings', ['comment_id'])
+    op.create_index('ix_cart_items_user_product_active', 'cart_items', ['user_id', 'product_id', 'is_active'])
+    op.create_index('ix_cart_items_cart_product', 'cart_items', ['cart_id', 'product_id'], postgresql_where=sa.text('is_active = true'))
+
+
+def downgrade() -> None:
+    op.drop_index('ix_cart_items_cart_product', table_name='cart_items')
+    op.drop_index('ix_cart_items_user_product_active', table_name='cart_items')
+    op.drop_index('ix_ratings_comment_id', table_name='ratings')
+    op.drop_index('ix_ratings_product_active', table_name='ratings')
+    op.drop_index('ix_comments_product_user_root', table_name='comments')
+    op.drop_index('ix_comments_product_active_post_date', table_name='comments')
+    op.drop_index('ix_products_available_supplier_id', table_name='products')
+    op.drop_index('ix_products_available_category_id', table_name='products')
+    op.drop_index('ix_products_available_id', table_name='products')
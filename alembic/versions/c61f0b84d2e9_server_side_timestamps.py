@@ -0,0 +1,37 @@
+"""server side timestamps
+
+Revision ID: c61f0b84d2e9
+Revises: a7d3e9f15b20
+Create Date: 2026-10-18 21:47:12.093415
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c61f0b84d2e9'
+down_revision: Union[str, None] = 'a7d3e9f15b20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute('UPDATE carts SET date_added = now() WHERE date_added IS NULL')
+    op.alter_column('carts', 'date_added', existing_type=sa.DateTime(), server_default=sa.func.now(), nullable=False)
+
+    for table in ('products', 'users'):
+        op.add_column(table, sa.Column('created_at', sa.DateTime(), server_default=sa.func.now(), nullable=False))
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(), server_default=sa.func.now(), nullable=False))
+        op.create_index(f'ix_{table}_updated_at', table, ['updated_at'])
+
+
+def downgrade() -> None:
+    for table in ('users', 'products'):
+        op.drop_index(f'ix_{table}_updated_at', table_name=table)
+        op.drop_column(table, 'updated_at')
+        op.drop_column(table, 'created_at')
+
+    op.alter_column('carts', 'date_added', existing_type=sa.DateTime(), server_default=None, nullable=True)
@@ -0,0 +1,48 @@
+"""comment post_date timestamp
+
+Revision ID: d93a5f17c0e8
+Revises: b4f0d83e6c52
+Create Date: 2026-10-18 19:51:05.662310
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd93a5f17c0e8'
+down_revision: Union[str, None] = 'b4f0d83e6c52'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+ROOT_COMMENTS = sa.text('parent_id IS NULL AND is_active = true')
+
+
+def upgrade() -> None:
+    op.execute('UPDATE comments SET post_date = now()::text WHERE post_date IS NULL')
+    op.alter_column(
+        'comments', 'post_date',
+        existing_type=sa.String(),
+        type_=sa.DateTime(),
+        postgresql_using='post_date::timestamp',
+        server_default=sa.func.now(),
+        nullable=False,
+    )
+    op.create_index('ix_comments_product_root_post_date', 'comments', ['product_id', 'post_date', 'id'], postgresql_where=ROOT_COMMENTS)
+    op.create_index('ix_comments_parent_id', 'comments', ['parent_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_comments_parent_id', table_name='comments')
+    op.drop_index('ix_comments_product_root_post_date', table_name='comments')
+    op.alter_column(
+        'comments', 'post_date',
+        existing_type=sa.DateTime(),
+        type_=sa.String(),
+        postgresql_using='post_date::text',
+        server_default=None,
+        nullable=True,
+    )
@@ -0,0 +1,30 @@
+"""product search index
+
+Revision ID: e51b2c7a9f04
+Revises: d93a5f17c0e8
+Create Date: 2026-10-18 20:17:42.930175
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e51b2c7a9f04'
+down_revision: Union[str, None] = 'd93a5f17c0e8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_products_search', 'products',
+        [sa.text("to_tsvector('english', coalesce(name, '') || ' ' || coalesce(description, ''))")],
+        postgresql_using='gin',
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_products_search', table_name='products')
@@ -0,0 +1,98 @@
+"""Compare per-worker throughput of the async session against the old sync one.
+
+    python -m benchmarks.async_load --concurrency 1 8 32 --query-latency-ms 5
+
+sync serves the product list the way the routers did before the async
+migration: a blocking SessionLocal query inside an async def handler, which
+holds the event loop for the whole query. async is the real /products/
+endpoint. Both run in-process on one event loop, i.e. one worker, behind the
+same middleware.
+
+A local SQLite file answers in microseconds, so there is no round trip for
+the async session to overlap. --query-latency-ms stands in for the network
+and server time of a remote database by sleeping inside SQLite (on the
+aiosqlite worker thread for the async engine) before every statement. Point
+BENCHMARK_DATABASE_URL at Postgres to measure the real thing.
+"""
+from dataclasses import asdict
+from sqlalchemy import event, select
+import argparse
+import asyncio
+import httpx
+import time
+
+from . import environment
+import main
+from database import SessionLocal, async_engine, engine
+from models.model_product import Product
+from routers.product import ProductPage
+from .run import Scenario, print_result, run_scenario
+from .seed import SeedConfig, seed_database
+
+
+@main.app.get('/benchmark/sync-products', response_model=ProductPage)
+async def sync_products(limit: int = 50):
+    db = SessionLocal()
+    try:
+        products = db.execute(select(*Product.__table__.columns).where(Product.is_active == True, Product.stock > 0).order_by(Product.id).limit(limit)).all()
+    finally:
+        db.close()
+
+    return {'Products': products}
+
+
+def add_query_latency(latency_ms: int):
+    def delay(milliseconds):
+        time.sleep(milliseconds / 1000)
+        return 1
+
+    def register_delay(dbapi_connection, connection_record):
+        dbapi_connection.create_function('benchmark_delay', 1, delay)
+
+    def delay_statement(conn, cursor, statement, parameters, context, executemany):
+        cursor.execute(f'SELECT benchmark_delay({latency_ms})')
+
+    for target in (engine, async_engine.sync_engine):
+        event.listen(target, 'connect', register_delay)
+        event.listen(target, 'before_cursor_execute', delay_statement)
+
+    engine.dispose()
+
+
+async def run_load(requests: int, concurrency_levels: list):
+    scenarios = [
+        Scenario('sync', 'GET', '/benchmark/sync-products', params=lambda i: {'limit': 50}),
+        Scenario('async', 'GET', '/products/', params=lambda i: {'limit': 50}),
+    ]
+
+    async with main.app.router.lifespan_context(main.app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url='http://benchmark') as client:
+            for concurrency in concurrency_levels:
+                for scenario in scenarios:
+                    await run_scenario(client, scenario, min(5, requests), 1, {})
+                    print_result(f'{scenario.name} x{concurrency}', await run_scenario(client, scenario, requests, concurrency, {}))
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description='Benchmark sync vs async database sessions on one worker.')
+    parser.add_argument('--products', type=int, default=10000)
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--query-latency-ms', type=int, default=0, help='simulated database latency per statement (SQLite only)')
+    args = parser.parse_args()
+
+    config = SeedConfig(products=args.products, comments_per_product=0, carts=0)
+    seed_database(engine, config)
+    print(f'Seeded {engine.url.render_as_string(hide_password=True)}: {asdict(config)}')
+
+    if args.query_latency_ms:
+        if engine.dialect.name != 'sqlite':
+            parser.error('--query-latency-ms only works with a SQLite database')
+
+        add_query_latency(args.query_latency_ms)
+
+    asyncio.run(run_load(args.requests, args.concurrency))
+
+
+if __name__ == '__main__':
+    main_cli()
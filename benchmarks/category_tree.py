@@ -0,0 +1,97 @@
+"""Compare ways of collecting the products of a category subtree.
+
+    python -m benchmarks.category_tree --category-depth 5 --category-branching 4
+
+loop is the original per-node walk (one product query and one subcategory
+query per category), cte is category_subtree_ids() and cached is the in-process
+category tree. Each is run against a top-level category and one of its children.
+"""
+from dataclasses import asdict
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+import argparse
+import asyncio
+import statistics
+import time
+
+from . import environment
+from database import AsyncSessionLocal, engine
+from models.model_category import Category, category_subtree_ids, load_category_tree
+from models.model_product import Product
+from .seed import SeedConfig, seed_database
+
+
+def products_by_loop(db: Session, category_id: int):
+    products = []
+    categories_to_process = [db.get(Category, category_id)]
+
+    while categories_to_process:
+        current_category = categories_to_process.pop()
+
+        products.extend(db.scalars(select(Product).where(Product.category_id == current_category.id, Product.is_active == True, Product.stock > 0)))
+
+        categories_to_process.extend(db.scalars(select(Category).where(Category.parent_id == current_category.id)))
+
+    return products
+
+
+def products_by_cte(db: Session, category_id: int):
+    return db.scalars(select(Product).where(Product.category_id.in_(category_subtree_ids(category_id)), Product.is_active == True, Product.stock > 0)).all()
+
+
+def products_by_cached_tree(category_tree):
+    def products(db: Session, category_id: int):
+        return db.scalars(select(Product).where(Product.category_id.in_(category_tree.descendant_ids[category_id]), Product.is_active == True, Product.stock > 0)).all()
+
+    return products
+
+
+def measure(strategy, category_id: int, repeat: int):
+    statements = []
+    count_statement = lambda *args: statements.append(1)
+    timings = []
+
+    event.listen(engine, 'before_cursor_execute', count_statement)
+    try:
+        for _ in range(repeat):
+            statements.clear()
+
+            with Session(engine) as db:
+                started = time.perf_counter()
+                products = strategy(db, category_id)
+                timings.append(time.perf_counter() - started)
+    finally:
+        event.remove(engine, 'before_cursor_execute', count_statement)
+
+    return len(products), len(statements), statistics.median(timings) * 1000
+
+
+async def load_tree():
+    async with AsyncSessionLocal() as db:
+        return await load_category_tree(db)
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description='Benchmark category subtree product lookups.')
+    parser.add_argument('--category-depth', type=int, default=5)
+    parser.add_argument('--category-branching', type=int, default=4)
+    parser.add_argument('--products', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    config = SeedConfig(customers=1, suppliers=5, category_depth=args.category_depth, category_branching=args.category_branching, products=args.products, comments_per_product=0, carts=0)
+    data = seed_database(engine, config)
+    print(f'Seeded {engine.url.render_as_string(hide_password=True)}: {asdict(config)}')
+
+    category_tree = asyncio.run(load_tree())
+    strategies = {'loop': products_by_loop, 'cte': products_by_cte, 'cached': products_by_cached_tree(category_tree)}
+    targets = {'top-level': data.category_ids[0], 'child': data.category_ids[args.category_branching]}
+
+    for target, category_id in targets.items():
+        for name, strategy in strategies.items():
+            products, statements, median_ms = measure(strategy, category_id, args.repeat)
+            print(f'{target:<10} {name:<7} {products:>7} products  {statements:>5} statements  {median_ms:>9.2f} ms')
+
+
+if __name__ == '__main__':
+    main_cli()
@@ -0,0 +1,13 @@
+import os
+import tempfile
+
+
+BENCHMARK_DATABASE_URL = os.getenv('BENCHMARK_DATABASE_URL', f'sqlite:///{os.path.join(tempfile.gettempdir(), "ecommerce-benchmark.db")}')
+
+os.environ['SQLALCHEMY_DATABASE_URL'] = BENCHMARK_DATABASE_URL
+os.environ.pop('SQLALCHEMY_ASYNC_DATABASE_URL', None)
+os.environ.pop('REPLICA_DATABASE_URLS', None)
+os.environ['SQL_DEBUG_HEADERS'] = 'true'
+os.environ['SQL_QUERY_BUDGET'] = '0'
+os.environ.setdefault('SECRET_KEY', 'benchmark-secret-key-not-for-production')
+os.environ.setdefault('ALGORITHM', 'HS256')
@@ -0,0 +1,141 @@
+"""Check that the hot queries are planned with the hot-path indexes.
+
+    python -m benchmarks.explain --products 5000
+
+Seeds a catalog, ANALYZEs it and sends one request per hot route through the
+app. Every SELECT, UPDATE and DELETE the request runs is EXPLAINed on the
+same connection with the same parameters, so the plans are the ones the
+database picks for the statements the app really issues, bound parameters
+included. A check passes when one of its statements is planned with one of
+the expected indexes. Exits non-zero when a check fails.
+
+The unfiltered product list also accepts a walk of the primary key: with
+most products available, the planner may prefer scanning products in id
+order, which needs no sort and stops after the page is full.
+"""
+from dataclasses import asdict, dataclass
+from typing import Callable, Optional
+from sqlalchemy import event, text
+import argparse
+import asyncio
+import httpx
+import sys
+
+from . import environment
+import main
+from database import async_engine, engine
+from .seed import SeedConfig, SeedData, mint_tokens, seed_database
+
+
+EXPLAINED_STATEMENTS = ('SELECT', 'WITH', 'UPDATE', 'DELETE')
+
+
+@dataclass
+class PlanCheck:
+    name: str
+    method: str
+    path: Callable
+    indexes: tuple
+    user: Optional[Callable] = None
+    params: Optional[Callable] = None
+    json: Optional[Callable] = None
+
+
+def build_checks(data: SeedData):
+    product_slug = data.root_comments[0][0]
+    comment_user_id, comment_id = data.root_comments[0][1:]
+    cart_user_id = data.cart_user_ids[0]
+
+    return [
+        PlanCheck('products.all', 'GET', lambda: '/products/', ('ix_products_available_id', 'products_pkey', 'SCAN products'), params=lambda: {'limit': 50}),
+        PlanCheck('products.by_category', 'GET', lambda: f'/products/{data.category_slugs[-1]}', ('ix_products_available_category_id',), params=lambda: {'limit': 50}),
+        PlanCheck('products.supplier', 'GET', lambda: f'/products/supplier/{data.supplier_ids[0]}', ('ix_products_available_supplier_id',), params=lambda: {'limit': 50}),
+        PlanCheck('comments.page', 'GET', lambda: f'/products/detail/{product_slug}', ('ix_comments_product_root_post_date', 'ix_comments_product_active_post_date'), params=lambda: {'comments_limit': 10}),
+        PlanCheck('comments.replies', 'GET', lambda: f'/products/detail/{product_slug}', ('ix_comments_parent_id',), params=lambda: {'comments_limit': 10}),
+        PlanCheck('comments.root_lookup', 'POST', lambda: f'/products/detail/{product_slug}/comment', ('ix_comments_product_user_root',), user=lambda: comment_user_id, json=lambda: {'create_comment': {'comment': 'Explain reply', 'parent_id': comment_id}, 'create_rating': {'rating': 5}}),
+        PlanCheck('ratings.by_comment', 'DELETE', lambda: '/products/comment/delete', ('ix_ratings_comment_id', 'ix_ratings_product_active'), user=lambda: comment_user_id, params=lambda: {'comment_id': comment_id}),
+        PlanCheck('cart.items', 'GET', lambda: '/cart/', ('ux_cart_items_cart_product_active',), user=lambda: cart_user_id),
+        PlanCheck('cart.item_lookup', 'PATCH', lambda: '/cart/remove', ('ix_cart_items_user_product_active',), user=lambda: cart_user_id, params=lambda: {'itm_id': 1}),
+    ]
+
+
+def explain_prefix(dialect_name: str):
+    return 'EXPLAIN QUERY PLAN ' if dialect_name == 'sqlite' else 'EXPLAIN '
+
+
+async def run_checks(client: httpx.AsyncClient, checks: list, tokens: dict):
+    prefix = explain_prefix(async_engine.dialect.name)
+    plans = []
+
+    def explain(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith(EXPLAINED_STATEMENTS):
+            cursor.execute(prefix + statement, parameters)
+            plans.append((statement, '\n'.join(' '.join(map(str, row)) for row in cursor.fetchall())))
+
+    results = []
+    event.listen(async_engine.sync_engine, 'before_cursor_execute', explain)
+    try:
+        for check in checks:
+            plans.clear()
+            response = await client.request(
+                check.method,
+                check.path(),
+                headers={'Authorization': f'Bearer {tokens[check.user()]}'} if check.user else {},
+                params=check.params() if check.params else None,
+                json=check.json() if check.json else None,
+            )
+            matched = [plan for plan in plans if any(index in plan[1] for index in check.indexes)]
+            results.append((check, response.status_code, matched or list(plans)))
+    finally:
+        event.remove(async_engine.sync_engine, 'before_cursor_execute', explain)
+
+    return results
+
+
+def failed_checks(results: list):
+    return [
+        check.name
+        for check, status_code, plans in results
+        if status_code >= 400 or not any(index in plan for _, plan in plans for index in check.indexes)
+    ]
+
+
+def analyze(sync_engine):
+    with sync_engine.begin() as connection:
+        connection.execute(text('ANALYZE'))
+
+
+async def run_explain(data: SeedData):
+    async with main.app.router.lifespan_context(main.app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url='http://benchmark') as client:
+            return await run_checks(client, build_checks(data), mint_tokens(data))
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description='EXPLAIN the hot queries and check they use the hot-path indexes.')
+    parser.add_argument('--products', type=int, default=5000)
+    parser.add_argument('--verbose', action='store_true', help='print every plan, not only failures')
+    args = parser.parse_args()
+
+    config = SeedConfig(products=args.products)
+    data = seed_database(engine, config)
+    analyze(engine)
+    print(f'Seeded {engine.url.render_as_string(hide_password=True)}: {asdict(config)}')
+
+    results = asyncio.run(run_explain(data))
+    failed = failed_checks(results)
+
+    for check, status_code, plans in results:
+        print(f"{'FAIL' if check.name in failed else 'ok':<5} {check.name:<22} {status_code}  expects {' or '.join(check.indexes)}")
+
+        if args.verbose or check.name in failed:
+            for statement, plan in plans:
+                print(f"        {' '.join(statement.split())[:160]}")
+                print('\n'.join(f'          {line}' for line in plan.splitlines()))
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main_cli()
@@ -0,0 +1,92 @@
+"""Measure login throughput and event loop stalls under a burst of logins.
+
+    python -m benchmarks.login --logins 100
+
+pool is the real /auth/token endpoint, hashing on the bounded password pool;
+inline calls bcrypt on the event loop as the handlers used to. While the
+logins run, a probe requests /category/all_categories every 50 ms; its
+latency shows how long other requests wait behind password hashing.
+Logins beyond PASSWORD_HASH_MAX_PENDING are answered with 503 in pool mode.
+"""
+from dataclasses import asdict
+from unittest import mock
+import argparse
+import asyncio
+import httpx
+import time
+
+from . import environment
+import main
+from database import engine
+from routers import auth
+from .run import percentile
+from .seed import SEED_PASSWORD, SeedConfig, seed_database
+
+
+async def run_password_hash_inline(func, *args):
+    return func(*args)
+
+
+async def probe(client: httpx.AsyncClient, latencies: list, done: asyncio.Event):
+    while not done.is_set():
+        started = time.perf_counter()
+        await client.get('/category/all_categories')
+        latencies.append(time.perf_counter() - started)
+        await asyncio.sleep(0.05)
+
+
+async def run_logins(client: httpx.AsyncClient, logins: int, customers: int):
+    statuses = {}
+    probe_latencies = []
+    done = asyncio.Event()
+
+    async def login(i: int):
+        response = await client.post('/auth/token', data={'username': f'customer-{i % customers}', 'password': SEED_PASSWORD})
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    probe_task = asyncio.create_task(probe(client, probe_latencies, done))
+    started = time.perf_counter()
+    await asyncio.gather(*(login(i) for i in range(logins)))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await probe_task
+
+    return {
+        'elapsed_s': elapsed,
+        'logins_per_s': statuses.get(200, 0) / elapsed,
+        'statuses': {str(status_code): count for status_code, count in sorted(statuses.items())},
+        'probe_p50_ms': percentile(probe_latencies, 0.50) * 1000,
+        'probe_max_ms': max(probe_latencies) * 1000,
+    }
+
+
+async def run_benchmark(logins: int, customers: int):
+    results = {}
+
+    async with main.app.router.lifespan_context(main.app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app, raise_app_exceptions=False), base_url='http://benchmark', timeout=None) as client:
+            results['pool'] = await run_logins(client, logins, customers)
+
+            with mock.patch.object(auth, 'run_password_hash', run_password_hash_inline):
+                results['inline'] = await run_logins(client, logins, customers)
+
+    return results
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description='Benchmark concurrent logins with pooled and inline bcrypt.')
+    parser.add_argument('--logins', type=int, default=100)
+    args = parser.parse_args()
+
+    config = SeedConfig(customers=args.logins, products=100, comments_per_product=0, carts=0)
+    seed_database(engine, config)
+    print(f'Seeded {engine.url.render_as_string(hide_password=True)}: {asdict(config)}')
+    print(f'password pool: {auth.PASSWORD_HASH_WORKERS} workers, {auth.PASSWORD_HASH_MAX_PENDING} pending max')
+
+    for name, result in asyncio.run(run_benchmark(args.logins, config.customers)).items():
+        print(f"{name:<7} {result['elapsed_s']:>7.2f} s  {result['logins_per_s']:>7.1f} logins/s  probe p50 {result['probe_p50_ms']:>8.2f} ms  "
+              f"probe max {result['probe_max_ms']:>8.2f} ms  {result['statuses']}")
+
+
+if __name__ == '__main__':
+    main_cli()
@@ -0,0 +1,78 @@
+"""Compare the memory held by a large product result.
+
+    python -m benchmarks.memory --products 100000
+
+orm loads select(Product) as tracked ORM instances, rows loads
+select(*Product.__table__.columns) as Core rows, which is what the list
+endpoints read. stream walks the same rows in EXPORT_BATCH_SIZE partitions
+the way /export does, keeping none of them. Each is measured with
+tracemalloc in a fresh session: retained is what is still allocated once
+the result has been read, peak is the high-water mark while reading.
+"""
+from dataclasses import asdict
+from sqlalchemy import select
+import argparse
+import asyncio
+import time
+import tracemalloc
+
+from . import environment
+from database import AsyncSessionLocal, engine
+from models.model_product import Product
+from routers.export import EXPORT_BATCH_SIZE
+from .seed import SeedConfig, seed_database
+
+
+async def load_orm(db):
+    return (await db.scalars(select(Product))).all()
+
+
+async def load_rows(db):
+    return (await db.execute(select(*Product.__table__.columns))).all()
+
+
+async def stream_rows(db):
+    result = await db.stream(select(*Product.__table__.columns).execution_options(yield_per=EXPORT_BATCH_SIZE))
+    count = 0
+
+    async for rows in result.partitions():
+        count += len(rows)
+
+    return range(count)
+
+
+async def measure(strategy):
+    async with AsyncSessionLocal() as db:
+        await db.connection()
+        tracemalloc.start()
+        started = time.perf_counter()
+
+        try:
+            products = await strategy(db)
+            elapsed = time.perf_counter() - started
+            retained, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+    return len(products), retained / 2 ** 20, peak / 2 ** 20, elapsed
+
+
+async def run_benchmark():
+    return {name: await measure(strategy) for name, strategy in (('orm', load_orm), ('rows', load_rows), ('stream', stream_rows))}
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description='Benchmark memory held by large product results.')
+    parser.add_argument('--products', type=int, default=100000)
+    args = parser.parse_args()
+
+    config = SeedConfig(customers=1, products=args.products, comments_per_product=0, carts=0)
+    seed_database(engine, config)
+    print(f'Seeded {engine.url.render_as_string(hide_password=True)}: {asdict(config)}')
+
+    for name, (products, retained, peak, elapsed) in asyncio.run(run_benchmark()).items():
+        print(f'{name:<7} {products:>7} products  retained {retained:>7.1f} MiB  peak {peak:>7.1f} MiB  {elapsed:>6.2f} s')
+
+
+if __name__ == '__main__':
+    main_cli()
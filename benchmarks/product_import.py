@@ -0,0 +1,110 @@
+"""Compare bulk product import throughput with one-by-one creation.
+
+    python -m benchmarks.product_import --rows 50000 --single-rows 500
+
+single posts each product to /products/create, one request and one commit
+per row, the way suppliers onboarded catalogs before the import endpoint.
+csv and ndjson stream the same rows to /products/import in 64 KiB chunks.
+"""
+from dataclasses import asdict
+import argparse
+import asyncio
+import csv
+import httpx
+import io
+import json
+import time
+
+from . import environment
+import main
+from database import engine
+from .seed import SeedConfig, mint_tokens, seed_database
+
+
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+
+def generate_rows(count: int, category_ids: list, prefix: str):
+    return [
+        {
+            'name': f'{prefix} product {index}',
+            'description': f'Imported {prefix} product number {index}',
+            'price': 1 + index % 2000,
+            'image_url': f'https://example.com/{prefix}/{index}.jpg',
+            'stock': 100,
+            'category': category_ids[index % len(category_ids)],
+        }
+        for index in range(count)
+    ]
+
+
+def encode_csv(rows: list):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=list(rows[0]))
+    writer.writeheader()
+    writer.writerows(rows)
+
+    return buffer.getvalue().encode()
+
+
+def encode_ndjson(rows: list):
+    return ''.join(json.dumps(row) + '\n' for row in rows).encode()
+
+
+async def upload_chunks(body: bytes):
+    for start in range(0, len(body), UPLOAD_CHUNK_SIZE):
+        yield body[start:start + UPLOAD_CHUNK_SIZE]
+
+
+async def run_single(client: httpx.AsyncClient, headers: dict, rows: list):
+    started = time.perf_counter()
+
+    for row in rows:
+        response = await client.post('/products/create', headers=headers, json=row)
+        assert response.status_code == 201 and 'error' not in response.json(), response.text
+
+    return len(rows), time.perf_counter() - started
+
+
+async def run_import(client: httpx.AsyncClient, headers: dict, body: bytes, content_type: str):
+    started = time.perf_counter()
+    response = await client.post('/products/import', headers={**headers, 'Content-Type': content_type}, content=upload_chunks(body))
+    elapsed = time.perf_counter() - started
+    result = response.json()
+    assert result['Failed'] == 0, result['Errors'][:5]
+
+    return result['Imported'], elapsed
+
+
+async def run_benchmark(headers: dict, category_ids: list, rows: int, single_rows: int):
+    results = {}
+
+    async with main.app.router.lifespan_context(main.app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url='http://benchmark', timeout=None) as client:
+            results['single'] = await run_single(client, headers, generate_rows(single_rows, category_ids, 'single'))
+            results['csv'] = await run_import(client, headers, encode_csv(generate_rows(rows, category_ids, 'csv')), 'text/csv')
+            results['ndjson'] = await run_import(client, headers, encode_ndjson(generate_rows(rows, category_ids, 'ndjson')), 'application/x-ndjson')
+
+    return results
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description='Benchmark bulk product import against single creates.')
+    parser.add_argument('--rows', type=int, default=50000, help='rows per bulk import')
+    parser.add_argument('--single-rows', type=int, default=500, help='rows created one request at a time')
+    args = parser.parse_args()
+
+    config = SeedConfig(customers=1, products=0, comments_per_product=0, carts=0)
+    data = seed_database(engine, config)
+    print(f'Seeded {engine.url.render_as_string(hide_password=True)}: {asdict(config)}')
+
+    supplier_id = data.supplier_ids[0]
+    headers = {'Authorization': f'Bearer {mint_tokens(data)[supplier_id]}'}
+    results = asyncio.run(run_benchmark(headers, data.category_ids, args.rows, args.single_rows))
+
+    for name, (rows, elapsed) in results.items():
+        print(f'{name:<7} {rows:>7} rows  {elapsed:>8.2f} s  {rows / elapsed:>10.1f} rows/s')
+
+
+if __name__ == '__main__':
+    main_cli()
@@ -0,0 +1,223 @@
+"""Seed a synthetic catalog and benchmark every router in-process.
+
+    python -m benchmarks.run --products 10000 --requests 200
+    python -m benchmarks.run --save-baseline benchmarks/baseline.json
+    python -m benchmarks.run --compare benchmarks/baseline.json
+
+The run drops and recreates every table in BENCHMARK_DATABASE_URL (a SQLite
+file in the temp directory by default), so never point it at real data.
+
+--compare fails when an endpoint issues more queries per request, returns more
+5xx responses, or its p50 latency grows past --tolerance. Tail percentiles are
+reported but not gated; they are too noisy on shared machines. Query counts
+come from X-SQL-Count, so queries issued while a response streams are not seen.
+"""
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Callable, Optional, Union
+import argparse
+import asyncio
+import json
+import platform
+import sys
+import time
+
+from . import environment
+import httpx
+import main
+from database import engine
+from .seed import SEED_PASSWORD, SeedConfig, SeedData, mint_tokens, seed_database
+
+
+LATENCY_SLACK_MS = 5.0
+
+
+@dataclass
+class Scenario:
+    name: str
+    method: str
+    path: Union[str, Callable]
+    user: Optional[Callable] = None
+    params: Optional[Callable] = None
+    json: Optional[Callable] = None
+    data: Optional[Callable] = None
+    requests: Optional[int] = None
+
+
+def percentile(values: list, fraction: float):
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, round(fraction * (len(values) - 1))))
+    return values[index]
+
+
+def build_scenarios(data: SeedData, requests: int):
+    products = data.product_slugs
+    customers = data.customer_ids
+    suppliers = data.supplier_ids
+    admin = lambda i: data.admin_id
+    customer = lambda i: customers[i % len(customers)]
+    reply_targets = data.root_comments[:requests] or [(products[0], customers[0], None)]
+
+    return [
+        Scenario('auth.token', 'POST', '/auth/token', data=lambda i: {'username': f'customer-{i % len(customers)}', 'password': SEED_PASSWORD}, requests=min(requests, 20)),
+        Scenario('category.all_categories', 'GET', '/category/all_categories'),
+        Scenario('category.update_category', 'PUT', '/category/update_category', user=admin, params=lambda i: {'category_id': data.category_ids[i % len(data.category_ids)]}, json=lambda i: {'name': f'Category renamed {i}'}, requests=min(requests, 50)),
+        Scenario('products.all', 'GET', '/products/', params=lambda i: {'limit': 50}),
+        Scenario('products.all_fields', 'GET', '/products/', params=lambda i: {'limit': 200, 'fields': 'name,price,rating'}),
+        Scenario('products.all_keyset', 'GET', '/products/', params=lambda i: {'limit': 50, 'after': (i * 97) % len(products)}),
+        Scenario('products.by_category', 'GET', lambda i: f'/products/{data.category_slugs[i % len(data.category_slugs)]}', params=lambda i: {'limit': 50}),
+        Scenario('products.search', 'GET', '/products/search', params=lambda i: {'q': ('wireless phone', 'gaming laptop', 'portable speaker', 'smart watch')[i % 4], 'limit': 20}),
+        Scenario('products.detail', 'GET', lambda i: f'/products/detail/{products[i % 50]}'),
+        Scenario('products.detail_uncached', 'GET', lambda i: f'/products/detail/{products[i % len(products)]}', params=lambda i: {'comments_limit': 10}),
+        Scenario('products.supplier', 'GET', lambda i: f'/products/supplier/{suppliers[i % len(suppliers)]}', params=lambda i: {'limit': 50}),
+        Scenario('products.add_cart', 'POST', lambda i: f'/products/detail/{products[i % len(products)]}', user=customer, params=lambda i: {'itm_quantity': 1}),
+        Scenario('products.reply_comment', 'POST', lambda i: f'/products/detail/{reply_targets[i % len(reply_targets)][0]}/comment', user=lambda i: reply_targets[i % len(reply_targets)][1], json=lambda i: {'create_comment': {'comment': f'Benchmark reply {i}', 'parent_id': reply_targets[i % len(reply_targets)][2]}, 'create_rating': {'rating': 5}}),
+        Scenario('permission.toggle_supplier', 'PATCH', '/permission/', user=admin, params=lambda i: {'user_id': data.permission_user_id}, requests=min(requests, 50)),
+        Scenario('profile.get', 'GET', '/profile/', user=lambda i: suppliers[i % len(suppliers)]),
+        Scenario('cart.get', 'GET', '/cart/', user=customer),
+        Scenario('cart.batch', 'POST', '/cart/batch', user=customer, json=lambda i: {'items': [{'product_id': int(i % 500) + 1, 'quantity': 1}, {'product_id': int(i % 700) + 2, 'quantity': 1}]}),
+        Scenario('cart.remove', 'PATCH', '/cart/remove', user=customer, params=lambda i: {'itm_id': int(i % 500) + 1}),
+        Scenario('cart.checkout', 'POST', '/cart/checkout', user=lambda i: data.cart_user_ids[i % len(data.cart_user_ids)], requests=min(requests, len(data.cart_user_ids))),
+        Scenario('metrics.get', 'GET', '/metrics/'),
+        Scenario('export.ratings', 'GET', '/export/ratings', user=admin, requests=min(requests, 5)),
+    ]
+
+
+async def run_scenario(client: httpx.AsyncClient, scenario: Scenario, requests: int, concurrency: int, tokens: dict):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    query_counts = []
+    statuses = {}
+
+    async def send(i: int):
+        headers = {'Authorization': f'Bearer {tokens[scenario.user(i)]}'} if scenario.user else {}
+
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.request(
+                scenario.method,
+                scenario.path(i) if callable(scenario.path) else scenario.path,
+                headers=headers,
+                params=scenario.params(i) if scenario.params else None,
+                json=scenario.json(i) if scenario.json else None,
+                data=scenario.data(i) if scenario.data else None,
+            )
+            await response.aread()
+            latencies.append(time.perf_counter() - started)
+
+        query_counts.append(int(response.headers.get('x-sql-count', 0)))
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(send(i) for i in range(requests)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        'requests': requests,
+        'errors': sum(count for status_code, count in statuses.items() if status_code >= 500),
+        'statuses': {str(status_code): count for status_code, count in sorted(statuses.items())},
+        'throughput_rps': requests / elapsed,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'queries_per_request': sum(query_counts) / len(query_counts),
+        'max_queries': max(query_counts),
+    }
+
+
+async def run_benchmarks(data: SeedData, requests: int, concurrency: int, only: Optional[str]):
+    tokens = mint_tokens(data)
+    results = {}
+
+    async with main.app.router.lifespan_context(main.app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url='http://benchmark') as client:
+            for scenario in build_scenarios(data, requests):
+                if only and only not in scenario.name:
+                    continue
+
+                scenario_requests = scenario.requests or requests
+                if scenario.method == 'GET':
+                    await run_scenario(client, scenario, min(5, scenario_requests), 1, tokens)
+
+                results[scenario.name] = await run_scenario(client, scenario, scenario_requests, concurrency, tokens)
+                print_result(scenario.name, results[scenario.name])
+
+    return results
+
+
+def print_result(name: str, result: dict):
+    print(f"{name:<30} {result['throughput_rps']:>9.1f} rps  p50 {result['p50_ms']:>8.2f} ms  p95 {result['p95_ms']:>8.2f} ms  p99 {result['p99_ms']:>8.2f} ms  "
+          f"{result['queries_per_request']:>5.1f} queries  {result['errors']} errors  {result['statuses']}")
+
+
+def compare_results(results: dict, baseline: dict, tolerance: float):
+    regressions = []
+
+    for name, result in results.items():
+        expected = baseline['results'].get(name)
+
+        if expected is None:
+            continue
+
+        if result['errors'] > expected['errors']:
+            regressions.append(f"{name}: {result['errors']} server errors (baseline {expected['errors']})")
+
+        if result['queries_per_request'] > expected['queries_per_request'] + 0.01:
+            regressions.append(f"{name}: {result['queries_per_request']:.2f} queries per request (baseline {expected['queries_per_request']:.2f})")
+
+        if result['p50_ms'] > max(expected['p50_ms'] * (1 + tolerance), expected['p50_ms'] + LATENCY_SLACK_MS):
+            regressions.append(f"{name}: p50 {result['p50_ms']:.2f} ms (baseline {expected['p50_ms']:.2f} ms, tolerance {tolerance:.0%})")
+
+    return regressions
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description='Seed a synthetic catalog and benchmark the API in-process.')
+    defaults = SeedConfig()
+    for name, value in asdict(defaults).items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=int, default=value)
+    parser.add_argument('--requests', type=int, default=200, help='requests per endpoint')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--only', help='run scenarios whose name contains this text')
+    parser.add_argument('--compare', help='baseline JSON file to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.5, help='allowed p50 latency growth over the baseline')
+    parser.add_argument('--save-baseline', help='write the results to this JSON file')
+    args = parser.parse_args()
+
+    config = SeedConfig(**{name: getattr(args, name) for name in asdict(defaults)})
+    started = time.perf_counter()
+    data = seed_database(engine, config)
+    print(f'Seeded {engine.url.render_as_string(hide_password=True)} in {time.perf_counter() - started:.1f} s: {asdict(config)}')
+
+    results = asyncio.run(run_benchmarks(data, args.requests, args.concurrency, args.only))
+    report = {
+        'created': datetime.utcnow().isoformat(timespec='seconds'),
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'database': engine.dialect.name,
+        },
+        'dataset': asdict(config),
+        'requests': args.requests,
+        'concurrency': args.concurrency,
+        'results': results,
+    }
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as file:
+            json.dump(report, file, indent=2, sort_keys=True)
+            file.write('\n')
+
+    if args.compare:
+        with open(args.compare) as file:
+            regressions = compare_results(results, json.load(file), args.tolerance)
+
+        for regression in regressions:
+            print(f'REGRESSION {regression}')
+
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main_cli()
@@ -0,0 +1,101 @@
+"""Measure /products/search latency over a large generated catalog.
+
+    python -m benchmarks.search --products 1000000
+    python -m benchmarks.search --skip-seed --requests 500
+
+Descriptions mix the 20 common seed words, each present in about half of
+the catalog, with a Zipf-distributed long tail of --vocabulary feature words.
+The common scenarios are the worst case: ranking and facets cover every
+match. The feature scenarios are closer to real queries.
+
+Seeding a million products takes a few minutes and about 2 GB of memory.
+--skip-seed reuses the catalog already in BENCHMARK_DATABASE_URL.
+--like-baseline also times the unindexed alternative, a LIKE '%term%' scan
+over name and description.
+"""
+from sqlalchemy import func, or_, select, text
+import argparse
+import asyncio
+import httpx
+import statistics
+import time
+
+from . import environment
+import main
+from database import engine
+from models.model_category import get_category_tree
+from models.model_product import Product
+from .run import Scenario, print_result, run_scenario
+from .seed import PRODUCT_WORDS, SeedConfig, feature_word, seed_database
+
+
+QUERIES = ('wireless phone', 'gaming laptop', 'portable speaker', 'smart watch', 'camera', 'premium compact monitor')
+
+
+def build_scenarios(vocabulary: int):
+    category_slugs = [node.slug for node in get_category_tree().by_id.values() if node.parent_id is None]
+    feature = lambda i: feature_word((i * 37) % vocabulary)
+
+    return [
+        Scenario('search.common_term', 'GET', '/products/search', params=lambda i: {'q': PRODUCT_WORDS[i % len(PRODUCT_WORDS)], 'limit': 20}),
+        Scenario('search.common_terms', 'GET', '/products/search', params=lambda i: {'q': QUERIES[i % len(QUERIES)], 'limit': 20}),
+        Scenario('search.feature', 'GET', '/products/search', params=lambda i: {'q': feature(i), 'limit': 20}),
+        Scenario('search.feature_common', 'GET', '/products/search', params=lambda i: {'q': f'{PRODUCT_WORDS[i % len(PRODUCT_WORDS)]} {feature(i)}', 'limit': 20}),
+        Scenario('search.feature_category', 'GET', '/products/search', params=lambda i: {'q': feature(i), 'category': category_slugs[i % len(category_slugs)], 'limit': 20}),
+        Scenario('search.feature_price_rating', 'GET', '/products/search', params=lambda i: {'q': feature(i), 'min_price': 100, 'max_price': 500, 'min_rating': 3, 'limit': 20}),
+        Scenario('search.common_deep_page', 'GET', '/products/search', params=lambda i: {'q': QUERIES[i % len(QUERIES)], 'limit': 20, 'offset': 500}),
+    ]
+
+
+async def run_search(requests: int, concurrency: int, vocabulary: int):
+    async with main.app.router.lifespan_context(main.app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url='http://benchmark') as client:
+            for scenario in build_scenarios(vocabulary):
+                await run_scenario(client, scenario, min(5, requests), 1, {})
+                print_result(scenario.name, await run_scenario(client, scenario, requests, concurrency, {}))
+
+
+def like_baseline(vocabulary: int):
+    timings = []
+
+    with engine.connect() as connection:
+        for query in (*QUERIES, *(feature_word((i * 37) % vocabulary) for i in range(len(QUERIES)))):
+            filters = [or_(Product.name.like(f'%{term}%'), Product.description.like(f'%{term}%')) for term in query.split()]
+            started = time.perf_counter()
+            connection.execute(select(func.count()).where(*filters, Product.is_active == True, Product.stock > 0)).scalar()
+            timings.append(time.perf_counter() - started)
+
+    print(f"{'like.scan':<30} {len(timings)} queries  median {statistics.median(timings) * 1000:>9.2f} ms  max {max(timings) * 1000:>9.2f} ms")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description='Benchmark product search over a generated catalog.')
+    parser.add_argument('--products', type=int, default=1000000)
+    parser.add_argument('--vocabulary', type=int, default=20000, help='long-tail feature words in descriptions')
+    parser.add_argument('--requests', type=int, default=200, help='requests per scenario')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--skip-seed', action='store_true', help='reuse the catalog already in the database')
+    parser.add_argument('--like-baseline', action='store_true', help='also time a LIKE scan for comparison')
+    args = parser.parse_args()
+
+    if not args.skip_seed:
+        config = SeedConfig(products=args.products, comments_per_product=0, carts=0, vocabulary=args.vocabulary)
+        started = time.perf_counter()
+        seed_database(engine, config)
+
+        with engine.begin() as connection:
+            connection.execute(text('ANALYZE'))
+
+        print(f'Seeded {args.products} products in {time.perf_counter() - started:.1f} s')
+
+    with engine.connect() as connection:
+        print(f'{engine.url.render_as_string(hide_password=True)}: {connection.execute(select(func.count()).select_from(Product)).scalar()} products')
+
+    asyncio.run(run_search(args.requests, args.concurrency, args.vocabulary))
+
+    if args.like_baseline:
+        like_baseline(args.vocabulary)
+
+
+if __name__ == '__main__':
+    main_cli()
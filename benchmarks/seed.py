@@ -0,0 +1,202 @@
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from sqlalchemy import insert, text
+from database import Base
+from models.model_cart import Cart, Cart_Item
+from models.model_category import Category
+from models.model_product import Product, Comment, Rating
+from models.model_user import User
+from routers.auth import ACCESS_TOKEN_EXPIRE, bcrypt_context, create_access_token
+import itertools
+import random
+
+
+SEED_PASSWORD = 'benchmark-password'
+SEED_CHUNK_SIZE = 5000
+PRODUCT_WORDS = (
+    'phone', 'laptop', 'camera', 'headphones', 'keyboard', 'monitor', 'charger', 'speaker', 'watch', 'tablet',
+    'wireless', 'portable', 'premium', 'compact', 'gaming', 'smart', 'ultra', 'classic', 'pro', 'mini',
+)
+
+
+@dataclass
+class SeedConfig:
+    customers: int = 200
+    suppliers: int = 20
+    category_depth: int = 3
+    category_branching: int = 4
+    products: int = 10000
+    comments_per_product: int = 3
+    carts: int = 100
+    vocabulary: int = 0
+    seed: int = 42
+
+
+@dataclass
+class SeedData:
+    admin_id: int = 0
+    permission_user_id: int = 0
+    supplier_ids: list = field(default_factory=list)
+    customer_ids: list = field(default_factory=list)
+    cart_user_ids: list = field(default_factory=list)
+    category_ids: list = field(default_factory=list)
+    category_slugs: list = field(default_factory=list)
+    product_slugs: list = field(default_factory=list)
+    root_comments: list = field(default_factory=list)
+    usernames: dict = field(default_factory=dict)
+
+
+def feature_word(rank: int):
+    return f'feature{rank}'
+
+
+def insert_chunks(connection, table, rows: list):
+    for start in range(0, len(rows), SEED_CHUNK_SIZE):
+        connection.execute(insert(table), rows[start:start + SEED_CHUNK_SIZE])
+
+
+def reset_sequences(connection):
+    if connection.dialect.name != 'postgresql':
+        return
+
+    for table in Base.metadata.sorted_tables:
+        if 'id' in table.columns:
+            connection.execute(text(f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), coalesce(max(id), 1)) FROM {table.name}"))
+
+
+def seed_database(engine, config: SeedConfig):
+    rng = random.Random(config.seed)
+    data = SeedData()
+    now = datetime.utcnow()
+    hashed_password = bcrypt_context.hash(SEED_PASSWORD)
+
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+
+    users = [{'id': 1, 'username': 'admin', 'is_admin': True, 'is_supplier': True, 'is_customer': False}]
+    users += [{'id': 2, 'username': 'permission-target', 'is_admin': False, 'is_supplier': False, 'is_customer': True}]
+    users += [{'id': 3 + index, 'username': f'supplier-{index}', 'is_admin': False, 'is_supplier': True, 'is_customer': False} for index in range(config.suppliers)]
+    users += [{'id': 3 + config.suppliers + index, 'username': f'customer-{index}', 'is_admin': False, 'is_supplier': False, 'is_customer': True} for index in range(config.customers)]
+
+    for user in users:
+        user.update(first_name=user['username'], last_name='Benchmark', email=f"{user['username']}@example.com", hashed_password=hashed_password, is_active=True)
+
+    data.usernames = {user['id']: user['username'] for user in users}
+    data.admin_id = 1
+    data.permission_user_id = 2
+    data.supplier_ids = [user['id'] for user in users if user['username'].startswith('supplier-')]
+    data.customer_ids = [user['id'] for user in users if user['username'].startswith('customer-')]
+
+    categories = []
+    parents = [(None, '')]
+    for depth in range(config.category_depth):
+        level = []
+
+        for parent_id, parent_slug in parents:
+            for branch in range(config.category_branching):
+                category_id = len(categories) + 1
+                slug = f'{parent_slug}-category-{depth}-{branch}' if parent_slug else f'category-{depth}-{branch}'
+                categories.append({'id': category_id, 'name': f'Category {depth}-{branch}', 'slug': slug, 'parent_id': parent_id, 'is_active': True})
+                level.append((category_id, slug))
+
+        parents = level
+
+    data.category_ids = [category['id'] for category in categories]
+    data.category_slugs = [category['slug'] for category in categories]
+
+    feature_words = [feature_word(rank) for rank in range(config.vocabulary)]
+    feature_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(config.vocabulary)))
+
+    products = []
+    for product_id in range(1, config.products + 1):
+        name = ' '.join(rng.sample(PRODUCT_WORDS, 3)) + f' {product_id}'
+        description = ' '.join(rng.choices(PRODUCT_WORDS, k=12))
+
+        if feature_words:
+            description += ' ' + ' '.join(rng.choices(feature_words, cum_weights=feature_weights, k=6))
+
+        products.append({
+            'id': product_id,
+            'name': name,
+            'slug': name.replace(' ', '-'),
+            'description': description,
+            'price': rng.randint(1, 2000),
+            'image_url': f'https://example.com/images/{product_id}.jpg',
+            'stock': 0 if rng.random() < 0.05 else 1000000,
+            'supplier_id': rng.choice(data.supplier_ids),
+            'category_id': rng.choice(data.category_ids),
+            'rating_sum': 0,
+            'rating_count': 0,
+            'is_active': rng.random() >= 0.02,
+        })
+
+    available_products = [product for product in products if product['is_active'] and product['stock'] > 0]
+    data.product_slugs = [product['slug'] for product in available_products]
+
+    comments = []
+    ratings = []
+    for product in available_products:
+        for customer_id in rng.sample(data.customer_ids, min(rng.randint(0, config.comments_per_product * 2), len(data.customer_ids))):
+            rating = rng.randint(1, 5)
+            comment_id = len(comments) + 1
+            comments.append({
+                'id': comment_id,
+                'product_id': product['id'],
+                'user_id': customer_id,
+                'comment': 'Benchmark review ' + ' '.join(rng.choices(PRODUCT_WORDS, k=8)),
+                'parent_id': None,
+                'is_active': True,
+                'post_date': now - timedelta(minutes=rng.randint(0, 525600)),
+                'rating': rating,
+            })
+            ratings.append({'id': len(ratings) + 1, 'product_id': product['id'], 'user_id': customer_id, 'comment_id': comment_id, 'rating': rating, 'is_active': True})
+            product['rating_sum'] += rating
+            product['rating_count'] += 1
+            data.root_comments.append((product['slug'], customer_id, comment_id))
+
+            if rng.random() < 0.3:
+                comments.append({
+                    'id': len(comments) + 1,
+                    'product_id': product['id'],
+                    'user_id': rng.choice(data.customer_ids),
+                    'comment': 'Benchmark reply',
+                    'parent_id': comment_id,
+                    'is_active': True,
+                    'post_date': comments[-1]['post_date'] + timedelta(minutes=rng.randint(1, 600)),
+                    'rating': None,
+                })
+
+    for product in products:
+        product['rating'] = product['rating_sum'] / product['rating_count'] if product['rating_count'] else None
+
+    carts = []
+    cart_items = []
+    for customer_id in data.customer_ids[:config.carts]:
+        cart_id = len(carts) + 1
+        carts.append({'id': cart_id, 'user_id': customer_id, 'is_active': True})
+
+        for product in rng.sample(available_products, min(rng.randint(1, 5), len(available_products))):
+            cart_items.append({'id': len(cart_items) + 1, 'user_id': customer_id, 'product_id': product['id'], 'quantity': rng.randint(1, 3), 'cart_id': cart_id, 'is_active': True})
+
+        data.cart_user_ids.append(customer_id)
+
+    with engine.begin() as connection:
+        insert_chunks(connection, User, users)
+        insert_chunks(connection, Category, categories)
+        insert_chunks(connection, Product, products)
+        insert_chunks(connection, Comment, comments)
+        insert_chunks(connection, Rating, ratings)
+        insert_chunks(connection, Cart, carts)
+        insert_chunks(connection, Cart_Item, cart_items)
+        reset_sequences(connection)
+
+    return data
+
+
+def mint_tokens(data: SeedData):
+    supplier_ids = {data.admin_id, *data.supplier_ids}
+
+    return {
+        user_id: create_access_token(username, user_id, user_id == data.admin_id, user_id in supplier_ids, user_id not in supplier_ids, ACCESS_TOKEN_EXPIRE + timedelta(hours=1))
+        for user_id, username in data.usernames.items()
+    }
@@ -0,0 +1,81 @@
+"""Compare product list serialization per 1,000 products.
+
+    python -m benchmarks.serialization --products 1000
+
+orm is the original path: ORM instances walked by jsonable_encoder and
+rendered by JSONResponse. rows is the current path: column rows turned into
+dicts, validated and dumped by pydantic-core through the ProductPage
+response model. fields is the same with a ?fields=id,name,price projection.
+The database read is outside the timings; only serialization is measured.
+"""
+from dataclasses import asdict
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+from sqlalchemy import select
+import argparse
+import asyncio
+import statistics
+import time
+
+from . import environment
+from database import AsyncSessionLocal, engine
+from models.model_product import Product
+from routers.product import ProductPage
+from .seed import SeedConfig, seed_database
+
+
+PROJECTED_FIELDS = (Product.id, Product.name, Product.price)
+
+
+async def load_products(products: int):
+    async with AsyncSessionLocal() as db:
+        orm = (await db.scalars(select(Product).order_by(Product.id).limit(products))).all()
+        rows = (await db.execute(select(*Product.__table__.columns).order_by(Product.id).limit(products))).all()
+        projected = (await db.execute(select(*PROJECTED_FIELDS).order_by(Product.id).limit(products))).all()
+
+    return orm, rows, projected
+
+
+def build_serializers(orm: list, rows: list, projected: list):
+    page = TypeAdapter(ProductPage)
+    dump_page = lambda products: page.dump_json(page.validate_python({'Products': [product._asdict() for product in products], 'Next': None}), exclude_unset=True)
+
+    return {
+        'orm': lambda: JSONResponse(jsonable_encoder({'Products': orm, 'Next': None})).body,
+        'rows': lambda: dump_page(rows),
+        'fields': lambda: dump_page(projected),
+    }
+
+
+def measure(serializer, repeat: int):
+    serializer()
+    timings = []
+
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = serializer()
+        timings.append(time.perf_counter() - started)
+
+    return len(body), statistics.median(timings) * 1000
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description='Benchmark product list serialization.')
+    parser.add_argument('--products', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    config = SeedConfig(customers=1, products=args.products, comments_per_product=0, carts=0)
+    seed_database(engine, config)
+    print(f'Seeded {engine.url.render_as_string(hide_password=True)}: {asdict(config)}')
+
+    orm, rows, projected = asyncio.run(load_products(args.products))
+
+    for name, serializer in build_serializers(orm, rows, projected).items():
+        size, median_ms = measure(serializer, args.repeat)
+        print(f'{name:<7} {len(rows):>6} products  {size / 1024:>8.1f} KiB  {median_ms:>8.2f} ms  {median_ms * 1000 / len(rows):>7.2f} ms per 1k')
+
+
+if __name__ == '__main__':
+    main_cli()
@@ -0,0 +1,103 @@
+from collections import OrderedDict
+from typing import Optional
+from dotenv import load_dotenv
+import hashlib
+import os
+import time
+
+
+load_dotenv()
+
+RESPONSE_CACHE_SIZE = int(os.getenv('RESPONSE_CACHE_SIZE', 1024))
+RESPONSE_CACHE_TTL = int(os.getenv('RESPONSE_CACHE_TTL', 60))
+REVOCATION_CACHE_SIZE = int(os.getenv('REVOCATION_CACHE_SIZE', 100000))
+REDIS_URL = os.getenv('REDIS_URL')
+
+
+class MemoryCache:
+    def __init__(self, max_size: int, ttl: int):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self.entries.get(key)
+
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self.entries[key]
+            return None
+
+        self.entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: Optional[int] = None):
+        self.entries[key] = (time.monotonic() + (ttl or self.ttl), value)
+        self.entries.move_to_end(key)
+
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    async def delete(self, key: str):
+        self.entries.pop(key, None)
+
+
+class RedisCache:
+    def __init__(self, client, ttl: int):
+        self.client = client
+        self.ttl = ttl
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.client.get(key)
+
+    async def set(self, key: str, value: bytes, ttl: Optional[int] = None):
+        await self.client.set(key, value, ex=ttl or self.ttl)
+
+    async def delete(self, key: str):
+        await self.client.delete(key)
+
+
+def create_cache(max_size: int, ttl: int):
+    if REDIS_URL:
+        from redis import asyncio as redis
+
+        return RedisCache(redis.from_url(REDIS_URL), ttl)
+
+    return MemoryCache(max_size, ttl)
+
+
+response_cache = create_cache(RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL)
+
+# Token revocations are kept apart from responses so page churn cannot evict
+# them. Without REDIS_URL this store is local to the process: a revocation only
+# reaches the worker that handled it, and other workers keep accepting the
+# user's tokens until they expire. Run more than one worker only with REDIS_URL.
+revocation_cache = create_cache(REVOCATION_CACHE_SIZE, RESPONSE_CACHE_TTL)
+
+
+def make_etag(body: bytes):
+    return f'"{hashlib.sha1(body).hexdigest()}"'
+
+
+async def get_cached_response(key: str):
+    value = await response_cache.get(key)
+
+    if value is None:
+        return None
+
+    etag, body = value.split(b'\n', 1)
+    return etag.decode(), body
+
+
+async def set_cached_response(key: str, body: bytes):
+    etag = make_etag(body)
+    await response_cache.set(key, etag.encode() + b'\n' + body)
+
+    return etag
+
+
+async def invalidate_cached_response(key: str):
+    await response_cache.delete(key)
@@ -1,17 +1,195 @@
-from sqlalchemy import create_engine
+from fastapi import Request
+from sqlalchemy import DateTime, create_engine, exc, func
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.sql.functions import FunctionElement
 from dotenv import load_dotenv
 import os
+import time
 
 
 load_dotenv()
 
+ASYNC_DRIVERS = {
+    'postgresql': 'postgresql+asyncpg',
+    'sqlite': 'sqlite+aiosqlite',
+}
+
+
+def get_async_database_url(database_url: str):
+    url = make_url(database_url)
+    return url.set(drivername=ASYNC_DRIVERS.get(url.get_backend_name(), url.drivername))
+
+
 SQLALCHEMY_DATABASE_URL = os.getenv('SQLALCHEMY_DATABASE_URL')
+SQLALCHEMY_ASYNC_DATABASE_URL = os.getenv('SQLALCHEMY_ASYNC_DATABASE_URL') or get_async_database_url(SQLALCHEMY_DATABASE_URL)
+
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 5))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 10))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 30))
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', -1))
+DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'false').lower() in ('1', 'true', 'yes')
+
+REPLICA_DATABASE_URLS = [url.strip() for url in os.getenv('REPLICA_DATABASE_URLS', '').split(',') if url.strip()]
+REPLICA_RETRY_SECONDS = float(os.getenv('REPLICA_RETRY_SECONDS', 30))
+READ_AFTER_WRITE_SECONDS = int(os.getenv('READ_AFTER_WRITE_SECONDS', 5))
+READ_PRIMARY_COOKIE = 'read_primary'
+
+
+class PoolStats:
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record_wait(self, wait: float):
+        self.checkouts += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+
+
+pool_stats = PoolStats()
+
+
+class MeasuredQueuePool(AsyncAdaptedQueuePool):
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            pool_stats.timeouts += 1
+            raise
+        finally:
+            pool_stats.record_wait(time.perf_counter() - started)
 
 
 engine = create_engine(SQLALCHEMY_DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+
+def create_pooled_engine(database_url):
+    return create_async_engine(
+        database_url,
+        poolclass=MeasuredQueuePool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+    )
+
+
+class ReplicaSet:
+    def __init__(self, engines, retry_after: float):
+        self.engines = engines
+        self.retry_after = retry_after
+        self.down_until = [0.0] * len(engines)
+        self.position = 0
+
+    def choose(self):
+        now = time.monotonic()
+
+        for _ in range(len(self.engines)):
+            index = self.position % len(self.engines)
+            self.position += 1
+
+            if self.down_until[index] <= now:
+                return self.engines[index]
+
+        return None
+
+    def mark_down(self, engine):
+        self.down_until[self.engines.index(engine)] = time.monotonic() + self.retry_after
+
+    def status(self):
+        now = time.monotonic()
+
+        return [
+            {
+                'url': engine.url.render_as_string(hide_password=True),
+                'healthy': down_until <= now,
+            }
+            for engine, down_until in zip(self.engines, self.down_until)
+        ]
+
+
+async_engine = create_pooled_engine(SQLALCHEMY_ASYNC_DATABASE_URL)
+read_replicas = ReplicaSet([create_pooled_engine(get_async_database_url(url)) for url in REPLICA_DATABASE_URLS], REPLICA_RETRY_SECONDS)
+AsyncSessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=async_engine, class_=AsyncSession)
+
 Base = declarative_base()
 
+
+class server_now(FunctionElement):
+    type = DateTime()
+    inherit_cache = True
+
+
+@compiles(server_now)
+def compile_server_now(element, compiler, **kw):
+    return compiler.process(func.now(), **kw)
+
+
+@compiles(server_now, 'postgresql')
+def compile_postgresql_server_now(element, compiler, **kw):
+    return "timezone('utc', now())"
+
+
+@compiles(server_now, 'sqlite')
+def compile_sqlite_server_now(element, compiler, **kw):
+    return "(strftime('%Y-%m-%d %H:%M:%f', 'now') || '000')"
+
+
+async def get_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def is_primary(db: AsyncSession):
+    return db.bind is async_engine
+
+
+async def get_read_db(request: Request):
+    replica = None if request.cookies.get(READ_PRIMARY_COOKIE) else read_replicas.choose()
+
+    if replica is not None:
+        db = AsyncSessionLocal(bind=replica)
+
+        try:
+            await db.connection()
+        except (exc.DBAPIError, OSError):
+            await db.close()
+            read_replicas.mark_down(replica)
+        else:
+            try:
+                async with db:
+                    yield db
+            except exc.DBAPIError as err:
+                if err.connection_invalidated:
+                    read_replicas.mark_down(replica)
+                raise
+            return
+
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def database_pool_status():
+    pool = async_engine.sync_engine.pool
+
+    return {
+        'size': pool.size(),
+        'checked_in': pool.checkedin(),
+        'checked_out': pool.checkedout(),
+        'overflow': pool.overflow(),
+        'checkouts': pool_stats.checkouts,
+        'timeouts': pool_stats.timeouts,
+        'total_wait_seconds': pool_stats.total_wait,
+        'max_wait_seconds': pool_stats.max_wait,
+        'average_wait_seconds': pool_stats.total_wait / pool_stats.checkouts if pool_stats.checkouts else 0.0,
+    }
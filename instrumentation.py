@@ -0,0 +1,176 @@
+from collections import Counter
+from contextvars import ContextVar
+from typing import Optional
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette import status
+from dotenv import load_dotenv
+import os
+import re
+import time
+
+
+load_dotenv()
+
+SQL_DEBUG_HEADERS = os.getenv('SQL_DEBUG_HEADERS', 'false').lower() in ('1', 'true', 'yes')
+SQL_QUERY_BUDGET = int(os.getenv('SQL_QUERY_BUDGET', 0))
+SQL_ROUTE_BUDGETS = os.getenv('SQL_ROUTE_BUDGETS', '')
+SQL_QUERY_BUDGET_STRICT = os.getenv('SQL_QUERY_BUDGET_STRICT', 'false').lower() in ('1', 'true', 'yes')
+SQL_REPEAT_THRESHOLD = int(os.getenv('SQL_REPEAT_THRESHOLD', 3))
+SQL_STATEMENT_BUCKETS = (1, 2, 5, 10, 20, 50, 100)
+SQL_TIME_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+FINGERPRINT_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b|\$\d+|%\(\w+\)s|:\w+")
+FINGERPRINT_LISTS = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+FINGERPRINT_SPACES = re.compile(r'\s+')
+
+
+class QueryStats:
+    def __init__(self):
+        self.count = 0
+        self.total_time = 0.0
+        self.fingerprints = Counter()
+
+    def record(self, statement: str, elapsed: float):
+        self.count += 1
+        self.total_time += elapsed
+        self.fingerprints[fingerprint(statement)] += 1
+
+    def repeated(self):
+        return {statement: count for statement, count in self.fingerprints.items() if count >= SQL_REPEAT_THRESHOLD}
+
+
+class RouteQueryStats:
+    def __init__(self):
+        self.requests = 0
+        self.statements = 0
+        self.total_time = 0.0
+        self.max_statements = 0
+        self.over_budget = 0
+        self.repeated = 0
+        self.statement_buckets = Counter()
+        self.time_buckets = Counter()
+
+    def record(self, query_stats: QueryStats, budget: int):
+        self.requests += 1
+        self.statements += query_stats.count
+        self.total_time += query_stats.total_time
+        self.max_statements = max(self.max_statements, query_stats.count)
+        self.over_budget += is_over_budget(query_stats, budget)
+        self.repeated += bool(query_stats.repeated())
+        self.statement_buckets[histogram_bucket(query_stats.count, SQL_STATEMENT_BUCKETS)] += 1
+        self.time_buckets[histogram_bucket(query_stats.total_time * 1000, SQL_TIME_BUCKETS_MS)] += 1
+
+    def as_dict(self):
+        return {
+            'requests': self.requests,
+            'average_statements': self.statements / self.requests,
+            'max_statements': self.max_statements,
+            'average_db_time_ms': self.total_time * 1000 / self.requests,
+            'over_budget': self.over_budget,
+            'repeated_statements': self.repeated,
+            'statements_histogram': histogram(self.statement_buckets, SQL_STATEMENT_BUCKETS),
+            'db_time_ms_histogram': histogram(self.time_buckets, SQL_TIME_BUCKETS_MS),
+        }
+
+
+def parse_route_budgets(value: str):
+    budgets = {}
+
+    for entry in value.split(','):
+        route_key, _, budget = entry.strip().rpartition('=')
+        if route_key:
+            budgets[route_key.strip()] = int(budget)
+
+    return budgets
+
+
+current_query_stats: ContextVar[Optional[QueryStats]] = ContextVar('current_query_stats', default=None)
+route_query_stats = {}
+route_query_budgets = parse_route_budgets(SQL_ROUTE_BUDGETS)
+
+
+def fingerprint(statement: str):
+    statement = FINGERPRINT_LITERALS.sub('?', statement)
+    statement = FINGERPRINT_LISTS.sub('(?)', statement)
+    return FINGERPRINT_SPACES.sub(' ', statement).strip()
+
+
+def histogram_bucket(value: float, buckets: tuple):
+    return next((bucket for bucket in buckets if value <= bucket), '+Inf')
+
+
+def histogram(counts: Counter, buckets: tuple):
+    total = 0
+    cumulative = {}
+
+    for bucket in (*buckets, '+Inf'):
+        total += counts[bucket]
+        cumulative[f'le_{bucket}'] = total
+
+    return cumulative
+
+
+def query_budget(route_key: str):
+    return route_query_budgets.get(route_key, SQL_QUERY_BUDGET)
+
+
+def is_over_budget(query_stats: QueryStats, budget: int):
+    return bool(budget) and query_stats.count > budget
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if current_query_stats.get() is not None:
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    query_stats = current_query_stats.get()
+
+    if query_stats is not None and conn.info.get('query_started'):
+        query_stats.record(statement, time.perf_counter() - conn.info['query_started'].pop())
+
+
+async def instrument_sql(request: Request, call_next):
+    query_stats = QueryStats()
+    token = current_query_stats.set(query_stats)
+
+    try:
+        response = await call_next(request)
+    finally:
+        current_query_stats.reset(token)
+
+    route = request.scope.get('route')
+    route_key = f'{request.method} {route.path if route else request.url.path}'
+    budget = query_budget(route_key)
+    route_query_stats.setdefault(route_key, RouteQueryStats()).record(query_stats, budget)
+
+    if is_over_budget(query_stats, budget) and SQL_QUERY_BUDGET_STRICT:
+        return JSONResponse(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            content={'detail': f'Query budget exceeded: {route_key} ran {query_stats.count} statements (budget {budget})'}
+        )
+
+    if SQL_DEBUG_HEADERS:
+        repeated = query_stats.repeated()
+
+        response.headers['X-SQL-Count'] = str(query_stats.count)
+        response.headers['X-SQL-Time-Ms'] = f'{query_stats.total_time * 1000:.2f}'
+        response.headers['X-SQL-Repeated'] = str(max(repeated.values(), default=0))
+
+        if is_over_budget(query_stats, budget):
+            response.headers['X-SQL-Budget-Exceeded'] = str(budget)
+
+    return response
+
+
+def sql_query_status():
+    return {
+        'query_budget': SQL_QUERY_BUDGET,
+        'route_budgets': dict(sorted(route_query_budgets.items())),
+        'routes': {route_key: stats.as_dict() for route_key, stats in sorted(route_query_stats.items())},
+    }
@@ -1,15 +1,46 @@
-from fastapi import FastAPI
-from database import engine
-from models import model_category, model_user, model_product, model_cart
-from routers import category, auth, product, permission, user_profile, cart
+from contextlib import asynccontextmanager, suppress
+from fastapi import FastAPI, Request
+from database import engine, AsyncSessionLocal, read_replicas, READ_AFTER_WRITE_SECONDS, READ_PRIMARY_COOKIE
+from instrumentation import instrument_sql
+from models import model_category, model_user, model_product, model_cart, model_order
+from routers import category, auth, product, permission, user_profile, cart, metrics, export
+import asyncio
 
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    async with AsyncSessionLocal() as db:
+        await model_category.load_category_tree(db)
+
+    category_tree_watcher = asyncio.create_task(model_category.watch_category_tree(AsyncSessionLocal))
+    yield
+    category_tree_watcher.cancel()
+
+    with suppress(asyncio.CancelledError):
+        await category_tree_watcher
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+@app.middleware('http')
+async def read_your_writes(request: Request, call_next):
+    response = await call_next(request)
+
+    if read_replicas.engines and request.method not in ('GET', 'HEAD', 'OPTIONS') and response.status_code < 400:
+        response.set_cookie(READ_PRIMARY_COOKIE, '1', max_age=READ_AFTER_WRITE_SECONDS, httponly=True, samesite='lax')
+
+    return response
+
+
+app.middleware('http')(instrument_sql)
+
 
 model_user.Base.metadata.create_all(bind=engine)
 model_category.Base.metadata.create_all(bind=engine)
 model_product.Base.metadata.create_all(bind=engine)
 model_cart.Base.metadata.create_all(bind=engine)
+model_order.Base.metadata.create_all(bind=engine)
 
 app.include_router(auth.router)
 app.include_router(category.router)
@@ -17,3 +48,5 @@ app.include_router(product.router)
 app.include_router(permission.router)
 app.include_router(user_profile.router)
 app.include_router(cart.router)
+app.include_router(metrics.router)
+app.include_router(export.router)
@@ -1,18 +1,27 @@
-from sqlalchemy import DateTime, String, Integer, Boolean, Column, ForeignKey
+from sqlalchemy import DateTime, String, Integer, Boolean, Column, ForeignKey, Index, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import relationship
-from database import Base
-from datetime import datetime
+from database import Base, server_now
 
 
 class Cart(Base):
     __tablename__ = 'carts'
 
     id = Column(Integer, primary_key=True, index=True)
-    date_added = Column(DateTime, default=datetime.now())
+    user_id = Column(Integer, ForeignKey('users.id'), index=True)
+    date_added = Column(DateTime, server_default=server_now(), nullable=False)
     is_active = Column(Boolean, default=True)
 
+    user = relationship('User', back_populates='carts')
     cart_items = relationship('Cart_Item', back_populates='cart')
 
+    __table_args__ = (
+        Index('ux_carts_user_active', user_id, unique=True, postgresql_where=is_active == True, sqlite_where=is_active == True),
+    )
+
+    __mapper_args__ = {'eager_defaults': True}
+
 
 class Cart_Item(Base):
     __tablename__ = 'cart_items'
@@ -23,8 +32,53 @@ class Cart_Item(Base):
     quantity = Column(Integer)
     cart_id = Column(Integer, ForeignKey('carts.id'))
     is_active = Column(Boolean, default=True)
+    updated_at = Column(DateTime, server_default=server_now(), onupdate=server_now(), nullable=False, index=True)
 
     user = relationship('User', back_populates='cart_items')
     products = relationship('Product', back_populates='cart_items')
     cart = relationship('Cart', back_populates='cart_items')
 
+    __table_args__ = (
+        Index('ix_cart_items_user_product_active', user_id, product_id, is_active),
+        Index('ux_cart_items_cart_product_active', cart_id, product_id, unique=True, postgresql_where=is_active == True, sqlite_where=is_active == True),
+    )
+
+
+def active_cart_query(user_id: int):
+    return select(Cart).where(Cart.user_id == user_id, Cart.is_active == True)
+
+
+def dialect_insert(db: AsyncSession):
+    return postgresql.insert if db.bind.dialect.name == 'postgresql' else sqlite.insert
+
+
+async def get_active_cart(db: AsyncSession, user_id: int):
+    cart = await db.scalar(active_cart_query(user_id))
+
+    if cart:
+        return cart
+
+    await db.execute(
+        dialect_insert(db)(Cart)
+        .values(user_id=user_id, is_active=True)
+        .on_conflict_do_nothing(index_elements=[Cart.user_id], index_where=Cart.is_active == True)
+    )
+
+    return await db.scalar(active_cart_query(user_id))
+
+
+async def upsert_cart_items(db: AsyncSession, user_id: int, cart_id: int, quantities: dict, replace: bool = False):
+    insert = dialect_insert(db)(Cart_Item).values([
+        {'user_id': user_id, 'product_id': product_id, 'quantity': quantity, 'cart_id': cart_id, 'is_active': True}
+        for product_id, quantity in sorted(quantities.items())
+    ])
+    quantity = insert.excluded.quantity if replace else Cart_Item.quantity + insert.excluded.quantity
+
+    return (await db.execute(
+        insert.on_conflict_do_update(
+            index_elements=[Cart_Item.cart_id, Cart_Item.product_id],
+            index_where=Cart_Item.is_active == True,
+            set_={'quantity': quantity, 'updated_at': server_now()},
+        )
+        .returning(Cart_Item.product_id, Cart_Item.quantity)
+    )).all()
@@ -1,20 +1,20 @@
-from typing import Annotated
+from contextlib import suppress
+from dataclasses import dataclass
+from typing import Annotated, Optional
 from fastapi import Depends
-from database import Base, SessionLocal
-from sqlalchemy import Column, ForeignKey, Integer, String, Boolean
+from database import Base, get_db, server_now
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, Boolean, func, select
+from sqlalchemy.exc import SQLAlchemyError
 from slugify import slugify
-from sqlalchemy.orm import Session, relationship
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import relationship
+import asyncio
+import os
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+CATEGORY_TREE_REFRESH_SECONDS = float(os.getenv('CATEGORY_TREE_REFRESH_SECONDS', 5))
 
-
-db_dependency = Annotated[Session, Depends(get_db)]
+db_dependency = Annotated[AsyncSession, Depends(get_db)]
 
 
 class Category(Base):
@@ -25,16 +25,105 @@ class Category(Base):
     slug = Column(String, unique=True, index=True)
     parent_id = Column(Integer, ForeignKey('categories.id'), nullable=True)
     is_active = Column(Boolean, default=True)
+    updated_at = Column(DateTime, server_default=server_now(), onupdate=server_now(), nullable=False)
 
     products = relationship("Product", back_populates="category")
 
 
 
-    def generate_slug(self, db: db_dependency):
+    async def generate_slug(self, db: db_dependency):
         if self.parent_id is not None:
-            parent_category = db.query(Category).filter(Category.id == self.parent_id).first()
+            parent_category = get_category_tree().by_id.get(self.parent_id)
+            if parent_category is None:
+                parent_category = await db.scalar(select(Category).where(Category.id == self.parent_id))
             parent_slug = parent_category.slug if parent_category else ''
             self.slug = f'{parent_slug}-{slugify(self.name)}'
         else:
             self.slug = slugify(self.name)
 
+
+def category_subtree_ids(category_id: int):
+    category_tree = select(Category.id).where(Category.id == category_id).cte('category_tree', recursive=True)
+    category_tree = category_tree.union_all(
+        select(Category.id).where(Category.parent_id == category_tree.c.id)
+    )
+
+    return select(category_tree.c.id)
+
+
+@dataclass(frozen=True, slots=True)
+class CategoryNode:
+    id: int
+    name: str
+    slug: str
+    parent_id: Optional[int]
+    is_active: bool
+
+
+class CategoryTree:
+    def __init__(self, nodes):
+        self.by_id = {node.id: node for node in nodes}
+        self.by_slug = {node.slug: node for node in nodes}
+
+        children = {}
+        for node in nodes:
+            children.setdefault(node.parent_id, []).append(node)
+        self.children = {parent_id: tuple(child_nodes) for parent_id, child_nodes in children.items()}
+
+        self.descendant_ids = {}
+        for node in nodes:
+            self._collect_descendants(node.id)
+
+    def _collect_descendants(self, category_id: int):
+        if category_id in self.descendant_ids:
+            return self.descendant_ids[category_id]
+
+        self.descendant_ids[category_id] = frozenset({category_id})
+        ids = {category_id}
+        for child in self.children.get(category_id, ()):
+            ids |= self._collect_descendants(child.id)
+
+        self.descendant_ids[category_id] = frozenset(ids)
+        return self.descendant_ids[category_id]
+
+
+_category_tree = CategoryTree(())
+_category_tree_version = None
+
+
+def get_category_tree():
+    return _category_tree
+
+
+async def get_category_tree_version(db: AsyncSession):
+    return tuple((await db.execute(select(func.count(Category.id), func.max(Category.updated_at)))).one())
+
+
+async def load_category_tree(db: AsyncSession):
+    global _category_tree, _category_tree_version
+
+    version = await get_category_tree_version(db)
+    nodes = [
+        CategoryNode(id=row.id, name=row.name, slug=row.slug, parent_id=row.parent_id, is_active=row.is_active)
+        for row in await db.execute(select(Category.id, Category.name, Category.slug, Category.parent_id, Category.is_active))
+    ]
+    _category_tree = CategoryTree(nodes)
+    _category_tree_version = version
+
+    return _category_tree
+
+
+async def refresh_category_tree(db: AsyncSession):
+    if await get_category_tree_version(db) != _category_tree_version:
+        await load_category_tree(db)
+
+    return _category_tree
+
+
+async def watch_category_tree(session_factory):
+    while True:
+        await asyncio.sleep(CATEGORY_TREE_REFRESH_SECONDS)
+
+        with suppress(SQLAlchemyError):
+            async with session_factory() as db:
+                await refresh_category_tree(db)
@@ -0,0 +1,27 @@
+from sqlalchemy import DateTime, Integer, Column, ForeignKey
+from sqlalchemy.orm import relationship
+from database import Base, server_now
+
+
+class Order(Base):
+    __tablename__ = 'orders'
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey('users.id'), index=True)
+    cart_id = Column(Integer, ForeignKey('carts.id'))
+    total = Column(Integer)
+    date_created = Column(DateTime, server_default=server_now())
+
+    order_items = relationship('Order_Item', back_populates='order')
+
+
+class Order_Item(Base):
+    __tablename__ = 'order_items'
+
+    id = Column(Integer, primary_key=True, index=True)
+    order_id = Column(Integer, ForeignKey('orders.id'), index=True)
+    product_id = Column(Integer, ForeignKey('products.id'))
+    quantity = Column(Integer)
+    price = Column(Integer)
+
+    order = relationship('Order', back_populates='order_items')
@@ -2,24 +2,16 @@ from ast import For
 from typing import Annotated
 from fastapi import Depends
 from slugify import slugify
-from database import Base
-from sqlalchemy import Float, String, Integer, Boolean, Column, ForeignKey
-from sqlalchemy.orm import relationship, Session
-from database import Base, SessionLocal
+from database import Base, server_now
+from sqlalchemy import DDL, DateTime, Float, String, Integer, Boolean, Column, ForeignKey, Index, and_, case, cast, event, text, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import relationship
+from database import Base, get_db
 from .model_category import Category
-from datetime import datetime
 
 
 
-def get_db():
-    db = Session()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
-db_dependency = Annotated[Session, Depends(get_db)]
+db_dependency = Annotated[AsyncSession, Depends(get_db)]
 
 
 class Product(Base):
@@ -35,7 +27,11 @@ class Product(Base):
     supplier_id = Column(Integer, ForeignKey('users.id'))
     category_id = Column(Integer, ForeignKey('categories.id'))
     rating = Column(Float)
+    rating_sum = Column(Integer, default=0, server_default='0')
+    rating_count = Column(Integer, default=0, server_default='0')
     is_active = Column(Boolean, default=True)
+    created_at = Column(DateTime, server_default=server_now(), nullable=False)
+    updated_at = Column(DateTime, server_default=server_now(), onupdate=server_now(), nullable=False, index=True)
 
     category = relationship('Category', back_populates='products')
     user = relationship('User', back_populates='products')
@@ -43,6 +39,14 @@ class Product(Base):
     ratings = relationship('Rating', back_populates='products')
     cart_items = relationship('Cart_Item', back_populates='products')
 
+    __table_args__ = (
+        Index('ix_products_available_id', id, postgresql_where=and_(is_active == True, stock > 0), sqlite_where=and_(is_active == True, stock > 0)),
+        Index('ix_products_available_category_id', category_id, id, postgresql_where=and_(is_active == True, stock > 0), sqlite_where=and_(is_active == True, stock > 0)),
+        Index('ix_products_available_supplier_id', supplier_id, id, postgresql_where=and_(is_active == True, stock > 0), sqlite_where=and_(is_active == True, stock > 0)),
+    )
+
+    __mapper_args__ = {'eager_defaults': True}
+
 
     def generate_slug(self):
         self.slug = slugify(self.name)
@@ -57,13 +61,23 @@ class Comment(Base):
     comment = Column(String)
     parent_id = Column(Integer, ForeignKey('comments.id'), nullable=True)
     is_active = Column(Boolean, default=True)
-    post_date = Column(String, default=datetime.utcnow())
+    post_date = Column(DateTime, server_default=server_now(), nullable=False)
+    updated_at = Column(DateTime, server_default=server_now(), onupdate=server_now(), nullable=False, index=True)
     rating = Column(Integer, nullable=True)
 
     user = relationship('User', back_populates='comments')
     products = relationship('Product', back_populates='comments')
     ratings = relationship('Rating', back_populates='comments')
 
+    __table_args__ = (
+        Index('ix_comments_product_active_post_date', product_id, is_active, post_date),
+        Index('ix_comments_product_user_root', product_id, user_id, postgresql_where=and_(parent_id == None, is_active == True), sqlite_where=and_(parent_id == None, is_active == True)),
+        Index('ix_comments_product_root_post_date', product_id, post_date, id, postgresql_where=and_(parent_id == None, is_active == True), sqlite_where=and_(parent_id == None, is_active == True)),
+        Index('ix_comments_parent_id', parent_id),
+    )
+
+    __mapper_args__ = {'eager_defaults': True}
+
 
 
 class Rating(Base):
@@ -75,11 +89,64 @@ class Rating(Base):
     comment_id = Column(Integer, ForeignKey('comments.id'))
     rating = Column(Integer)
     is_active = Column(Boolean, default=True)
+    updated_at = Column(DateTime, server_default=server_now(), onupdate=server_now(), nullable=False, index=True)
 
     user = relationship('User', back_populates='ratings')
     products = relationship('Product', back_populates='ratings')
     comments = relationship('Comment', back_populates='ratings')
-    
-
-
 
+    __table_args__ = (
+        Index('ix_ratings_product_active', product_id, is_active),
+        Index('ix_ratings_comment_id', comment_id),
+    )
+
+
+def update_product_rating(product_id: int, rating_delta: int, count_delta: int):
+    rating_sum = Product.rating_sum + rating_delta
+    rating_count = Product.rating_count + count_delta
+
+    return update(Product).where(Product.id == product_id).values(
+        rating_sum=rating_sum,
+        rating_count=rating_count,
+        rating=case((rating_count > 0, cast(rating_sum, Float) / rating_count), else_=None),
+    ).execution_options(synchronize_session=False)
+
+
+PRODUCT_SEARCH_DOCUMENT = "to_tsvector('english', coalesce(name, '') || ' ' || coalesce(description, ''))"
+
+product_search_ddl = [
+    DDL(f'CREATE INDEX IF NOT EXISTS ix_products_search ON products USING gin ({PRODUCT_SEARCH_DOCUMENT})').execute_if(dialect='postgresql'),
+    DDL("CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(name, description, content='products', content_rowid='id')").execute_if(dialect='sqlite'),
+    DDL("""
+        CREATE TRIGGER IF NOT EXISTS products_fts_insert AFTER INSERT ON products BEGIN
+            INSERT INTO products_fts(rowid, name, description) VALUES (new.id, new.name, new.description);
+        END
+    """).execute_if(dialect='sqlite'),
+    DDL("""
+        CREATE TRIGGER IF NOT EXISTS products_fts_delete AFTER DELETE ON products BEGIN
+            INSERT INTO products_fts(products_fts, rowid, name, description) VALUES ('delete', old.id, old.name, old.description);
+        END
+    """).execute_if(dialect='sqlite'),
+    DDL("""
+        CREATE TRIGGER IF NOT EXISTS products_fts_update AFTER UPDATE OF name, description ON products BEGIN
+            INSERT INTO products_fts(products_fts, rowid, name, description) VALUES ('delete', old.id, old.name, old.description);
+            INSERT INTO products_fts(rowid, name, description) VALUES (new.id, new.name, new.description);
+        END
+    """).execute_if(dialect='sqlite'),
+]
+
+for ddl in product_search_ddl:
+    event.listen(Product.__table__, 'after_create', ddl)
+
+event.listen(Product.__table__, 'after_drop', DDL('DROP TABLE IF EXISTS products_fts').execute_if(dialect='sqlite'))
+
+
+@event.listens_for(Base.metadata, 'after_create')
+def backfill_product_search(target, connection, **kw):
+    if connection.dialect.name != 'sqlite' or connection.execute(text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'products_fts'")).first():
+        return
+
+    for ddl in product_search_ddl:
+        ddl(Product.__table__, connection)
+
+    connection.execute(text("INSERT INTO products_fts(products_fts) VALUES ('rebuild')"))
@@ -1,5 +1,5 @@
-from database import Base
-from sqlalchemy import Column, Integer, String, Boolean
+from database import Base, server_now
+from sqlalchemy import Column, DateTime, Integer, String, Boolean
 from sqlalchemy.orm import relationship
 
 
@@ -16,10 +16,15 @@ class User(Base):
     is_admin = Column(Boolean, default=False)
     is_supplier = Column(Boolean, default=False)
     is_customer = Column(Boolean, default=True)
+    created_at = Column(DateTime, server_default=server_now(), nullable=False)
+    updated_at = Column(DateTime, server_default=server_now(), onupdate=server_now(), nullable=False, index=True)
 
     products = relationship('Product', back_populates='user')
     comments = relationship('Comment', back_populates='user')
     ratings = relationship('Rating', back_populates='user')
     cart_items = relationship('Cart_Item', back_populates='user')
+    carts = relationship('Cart', back_populates='user')
+
+    __mapper_args__ = {'eager_defaults': True}
 
 
@@ -1,16 +1,23 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta, datetime
-from typing import Annotated
+from typing import Annotated, NamedTuple
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
-from database import SessionLocal
+from database import get_db
 from models.model_user import User
+import cache
 from passlib.context import CryptContext
 from fastapi.security import OAuth2PasswordRequestForm, OAuth2PasswordBearer
 from jose import jwt, JWTError
 from dotenv import load_dotenv
+import asyncio
+import hashlib
 import os
+import time
 
 
 load_dotenv()
@@ -19,23 +26,27 @@ load_dotenv()
 router = APIRouter(prefix='/auth', tags=['auth'])
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
-db_dependency = Annotated[Session, Depends(get_db)]
+db_dependency = Annotated[AsyncSession, Depends(get_db)]
 
 
 SECRET_KEY = os.getenv('SECRET_KEY')
 ALGORITHM = os.getenv('ALGORITHM')
 
 
+ACCESS_TOKEN_EXPIRE = timedelta(minutes=20)
+TOKEN_CACHE_SIZE = int(os.getenv('TOKEN_CACHE_SIZE', 1024))
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', 4))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv('PASSWORD_HASH_MAX_PENDING', 64))
+REVOCATION_SYNC_SECONDS = float(os.getenv('REVOCATION_SYNC_SECONDS', 1))
+
+
 bcrypt_context = CryptContext(schemes=['bcrypt'], deprecated='auto')
 oauth2_bearer = OAuth2PasswordBearer(tokenUrl='auth/token')
+password_hash_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix='password-hash')
+password_hash_pending = 0
+token_cache = OrderedDict()
+revoked_users = {}
+revocation_checks = OrderedDict()
 
 
 class CreateUserRequest(BaseModel):
@@ -51,20 +62,61 @@ class Token(BaseModel):
     token_type: str
 
 
+class Principal(NamedTuple):
+    username: str
+    id: int
+    is_admin: bool
+    is_supplier: bool
+    is_customer: bool
+    issued_at: float
+    expires_at: float
+
+
+
+def password_hash_queue_depth():
+    return password_hash_pending
+
+
+async def run_password_hash(func, *args):
+    global password_hash_pending
+
+    if password_hash_pending >= PASSWORD_HASH_MAX_PENDING:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail='Server is busy, please try again later',
+            headers={'Retry-After': '1'}
+        )
+
+    password_hash_pending += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(password_hash_executor, func, *args)
+    finally:
+        password_hash_pending -= 1
+
+
+async def hash_password(password: str):
+    return await run_password_hash(bcrypt_context.hash, password)
+
+
+async def verify_password(password: str, hashed_password: str):
+    return await run_password_hash(bcrypt_context.verify, password, hashed_password)
+
 
 @router.post('/', status_code=status.HTTP_201_CREATED)
 async def create_user(db: db_dependency, create_user_request: CreateUserRequest):
+    hashed_password = await hash_password(create_user_request.password)
+
     try:
         create_user_model = User(
             first_name=create_user_request.first_name,
             last_name=create_user_request.last_name,
             username=create_user_request.username,
             email=create_user_request.email,
-            hashed_password=bcrypt_context.hash(create_user_request.password),
+            hashed_password=hashed_password,
         )
 
         db.add(create_user_model)
-        db.commit()
+        await db.commit()
 
         return{
             'status_code': 201,
@@ -77,26 +129,29 @@ async def create_user(db: db_dependency, create_user_request: CreateUserRequest)
         }
 
 
-def authanticate_user(username: str, password: str, db: db_dependency):
-    user = db.query(User).filter(User.username == username).first()
+async def authanticate_user(username: str, password: str, db: db_dependency):
+    user = await db.scalar(select(User).where(User.username == username))
+    await db.close()
 
     if not user:
         return False
-    if not bcrypt_context.verify(password, user.hashed_password):
+    if not await verify_password(password, user.hashed_password):
         return False
     return user
 
 
 def create_access_token(username: str, user_id: int, is_admin: bool, is_supplier: bool, is_customer: bool, expires_delta: timedelta):
     encode = {'sub': username, 'id': user_id, 'is_admin': is_admin, 'is_supplier': is_supplier, 'is_customer': is_customer}
-    expires = datetime.utcnow() + expires_delta
-    encode.update({'exp': expires})
+    issued_at = time.time()
+    issued = datetime.utcfromtimestamp(issued_at)
+    expires = issued + expires_delta
+    encode.update({'iat': issued, 'iat_us': int(issued_at * 1000000), 'exp': expires})
     return jwt.encode(encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
 @router.post('/token', response_model=Token)
 async def login_for_access_token(db: db_dependency, form_data: Annotated[OAuth2PasswordRequestForm, Depends()]):
-    user = authanticate_user(form_data.username, form_data.password, db)
+    user = await authanticate_user(form_data.username, form_data.password, db)
 
     if not user or user.is_active == False:
         raise HTTPException(
@@ -104,7 +159,7 @@ async def login_for_access_token(db: db_dependency, form_data: Annotated[OAuth2P
             detail='Could not validate user'
         )
 
-    token = create_access_token(user.username, user.id, user.is_admin, user.is_supplier, user.is_customer, expires_delta=timedelta(minutes=20))
+    token = create_access_token(user.username, user.id, user.is_admin, user.is_supplier, user.is_customer, expires_delta=ACCESS_TOKEN_EXPIRE)
 
     return {
         'access_token': token,
@@ -112,32 +167,84 @@ async def login_for_access_token(db: db_dependency, form_data: Annotated[OAuth2P
     }
 
 
+def revocation_key(user_id: int):
+    return f'revoked-user:{user_id}'
+
+
+async def revoke_user_tokens(user_id: int):
+    now = time.time()
+    revoked_users[user_id] = now
+
+    for revoked_id, revoked_at in list(revoked_users.items()):
+        if revoked_at < now - ACCESS_TOKEN_EXPIRE.total_seconds():
+            del revoked_users[revoked_id]
+
+    for digest, principal in list(token_cache.items()):
+        if principal.id == user_id:
+            del token_cache[digest]
+
+    await cache.revocation_cache.set(revocation_key(user_id), str(now).encode(), int(ACCESS_TOKEN_EXPIRE.total_seconds()))
+
+
+async def get_revoked_at(user_id: int):
+    if revocation_checks.get(user_id, 0) <= time.monotonic():
+        shared_revoked_at = await cache.revocation_cache.get(revocation_key(user_id))
+
+        if shared_revoked_at is not None:
+            revoked_users[user_id] = max(revoked_users.get(user_id, 0), float(shared_revoked_at))
+
+        revocation_checks[user_id] = time.monotonic() + REVOCATION_SYNC_SECONDS
+        revocation_checks.move_to_end(user_id)
+        if len(revocation_checks) > TOKEN_CACHE_SIZE:
+            revocation_checks.popitem(last=False)
+
+    return revoked_users.get(user_id)
+
+
 async def get_current_user(token: Annotated[str, Depends(oauth2_bearer)]):
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get('sub')
-        user_id: int = payload.get('id')
-        is_admin: str = payload.get('is_admin')
-        is_supplier: str = payload.get('is_supplier')
-        is_customer: str = payload.get('is_customer')
-
-        if username is None or user_id is None:
+    digest = hashlib.sha256(token.encode()).digest()
+    principal = token_cache.get(digest)
+
+    if principal is not None and principal.expires_at > time.time():
+        token_cache.move_to_end(digest)
+    else:
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+            username: str = payload.get('sub')
+            user_id: int = payload.get('id')
+
+            if username is None or user_id is None:
+                raise HTTPException(
+                    status_code=status.HTTP_401_UNAUTHORIZED,
+                    detail='Could not validate user'
+                ) 
+            
+            principal = Principal(
+                username=username,
+                id=user_id,
+                is_admin=payload.get('is_admin'),
+                is_supplier=payload.get('is_supplier'),
+                is_customer=payload.get('is_customer'),
+                issued_at=payload['iat_us'] / 1000000 if 'iat_us' in payload else payload.get('iat', 0),
+                expires_at=payload.get('exp'),
+            )
+        except JWTError:
             raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail='Could not validate user'
-            ) 
-        
-        return {
-            'username': username,
-            'id': user_id,
-            'is_admin': is_admin,
-            'is_supplier': is_supplier,
-            'is_customer': is_customer,
-        }
-    except JWTError:
+                    status_code=status.HTTP_401_UNAUTHORIZED,
+                    detail='Could not validate user'
+                ) 
+
+    revoked_at = await get_revoked_at(principal.id)
+    if revoked_at is not None and principal.issued_at <= revoked_at:
+        token_cache.pop(digest, None)
         raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail='Could not validate user'
-            ) 
-    
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail='Could not validate user'
+        )
+
+    token_cache[digest] = principal
+    token_cache.move_to_end(digest)
+    if len(token_cache) > TOKEN_CACHE_SIZE:
+        token_cache.popitem(last=False)
 
+    return principal
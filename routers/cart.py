@@ -1,49 +1,54 @@
 from typing import Annotated
 from fastapi import APIRouter, Depends, HTTPException
-from database import SessionLocal
-from sqlalchemy.orm import Session
+from pydantic import BaseModel, Field
+from cache import invalidate_cached_response
+from database import get_db
+from sqlalchemy import case, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
-from models.model_cart import Cart, Cart_Item
+from models.model_cart import Cart, Cart_Item, get_active_cart, upsert_cart_items
+from models.model_order import Order, Order_Item
 from models.model_product import Product
-from routers.auth import get_current_user
+from routers.auth import get_current_user, Principal
+from routers.product import ProductOut, product_detail_key
 
 
 router = APIRouter(prefix='/cart', tags=['cart'])
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+db_dependency = Annotated[AsyncSession, Depends(get_db)]
+user_dependency = Annotated[Principal, Depends(get_current_user)]
 
 
-db_dependency = Annotated[Session, Depends(get_db)]
-user_dependency = Annotated[dict, Depends(get_current_user)]
+class CartItemChange(BaseModel):
+    product_id: int
+    quantity: int
+
+
+class CartBatch(BaseModel):
+    items: list[CartItemChange] = Field(max_length=200)
+    replace: bool = False
 
 
 @router.get('/', status_code=status.HTTP_200_OK)
 async def get_cart(db: db_dependency, user: user_dependency):
-    cart_items = db.query(Cart_Item).filter(Cart_Item.user_id == user.get('id'), Cart_Item.is_active == True, Cart_Item.quantity >= 1).all()
+    sub_total = (Product.price * Cart_Item.quantity).label('sub_total')
+    cart_items = (await db.execute(select(*Product.__table__.columns, Cart_Item.quantity, sub_total).join(Cart_Item, Cart_Item.product_id == Product.id).join(Cart, Cart.id == Cart_Item.cart_id).where(Cart.user_id == user.id, Cart.is_active == True, Cart_Item.is_active == True, Cart_Item.quantity >= 1))).all()
 
     if not cart_items:
         return{
             'Message': 'Your cart is empty'
         }
     
-    total = 0
-    cart = []
-
-    for item in cart_items:
-        product = db.query(Product).filter(Product.id == item.product_id).first()
-        sub_total = product.price * item.quantity
-        total += sub_total
-        cart.append({
-            'Product': product,
-            'Quantity': item.quantity,
-            'Subtotal': sub_total
-        })
+    cart = [
+        {
+            'Product': ProductOut.model_validate(cart_item, from_attributes=True),
+            'Quantity': cart_item.quantity,
+            'Subtotal': cart_item.sub_total
+        }
+        for cart_item in cart_items
+    ]
+    total = sum(item['Subtotal'] for item in cart)
 
     return{
         'Cart': cart,
@@ -53,22 +58,24 @@ async def get_cart(db: db_dependency, user: user_dependency):
 
 @router.patch('/remove', status_code=status.HTTP_200_OK)
 async def remove_item(db: db_dependency, user: user_dependency, itm_id: int):
-    cart_item = db.query(Cart_Item).filter(Cart_Item.user_id == user.get('id'), Cart_Item.product_id == itm_id, Cart_Item.is_active == True).first()
+    cart_item_id = await db.scalar(select(Cart_Item.id).where(Cart_Item.user_id == user.id, Cart_Item.product_id == itm_id, Cart_Item.is_active == True))
 
-    if not cart_item:
+    if not cart_item_id:
         return{
             'status_code': status.HTTP_404_NOT_FOUND,
             'detail': 'There is not in the cart'
         }
     
-    if cart_item.quantity > 1:
-        cart_item.quantity -= 1
-    else:
-        cart_item.quantity = 0
-        cart_item.is_active = False
-
-    db.add(cart_item)
-    db.commit()
+    await db.execute(
+        update(Cart_Item)
+        .where(Cart_Item.id == cart_item_id, Cart_Item.is_active == True)
+        .values(
+            quantity=case((Cart_Item.quantity > 1, Cart_Item.quantity - 1), else_=0),
+            is_active=Cart_Item.quantity > 1,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
 
     return{
         'status_code': status.HTTP_200_OK,
@@ -78,7 +85,7 @@ async def remove_item(db: db_dependency, user: user_dependency, itm_id: int):
 
 @router.delete('/delete', status_code=status.HTTP_200_OK)
 async def delete_item(db: db_dependency, user: user_dependency, itm_id: int):
-    cart_item = db.query(Cart_Item).filter(Cart_Item.user_id == user.get('id'), Cart_Item.product_id == itm_id, Cart_Item.is_active == True).first()
+    cart_item = await db.scalar(select(Cart_Item).where(Cart_Item.user_id == user.id, Cart_Item.product_id == itm_id, Cart_Item.is_active == True))
     
     if not cart_item:
         return{
@@ -90,7 +97,7 @@ async def delete_item(db: db_dependency, user: user_dependency, itm_id: int):
     cart_item.quantity = 0
 
     db.add(cart_item)
-    db.commit()
+    await db.commit()
 
     return{
         'status_code': status.HTTP_200_OK,
@@ -98,4 +105,144 @@ async def delete_item(db: db_dependency, user: user_dependency, itm_id: int):
     }
 
 
+@router.post('/batch', status_code=status.HTTP_200_OK)
+async def batch_update(db: db_dependency, user: user_dependency, cart_batch: CartBatch):
+    cart = await get_active_cart(db, user.id)
+
+    changes = {}
+    for change in cart_batch.items:
+        changes[change.product_id] = change.quantity if cart_batch.replace else changes.get(change.product_id, 0) + change.quantity
+
+    additions = {product_id: quantity for product_id, quantity in changes.items() if quantity > 0}
+    removals = {} if cart_batch.replace else {product_id: delta for product_id, delta in changes.items() if delta < 0}
+
+    if additions:
+        in_cart_ids = set((await db.scalars(select(Cart_Item.product_id).where(Cart_Item.cart_id == cart.id, Cart_Item.is_active == True, Cart_Item.product_id.in_(list(additions))))).all())
+        new_product_ids = set(additions) - in_cart_ids
+        available_ids = set((await db.scalars(select(Product.id).where(Product.id.in_(new_product_ids), Product.is_active == True, Product.stock > 0))).all()) if new_product_ids else set()
+
+        if new_product_ids - available_ids:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f'Product not found: {", ".join(map(str, sorted(new_product_ids - available_ids)))}'
+            )
+
+    if cart_batch.replace:
+        await db.execute(
+            update(Cart_Item)
+            .where(Cart_Item.cart_id == cart.id, Cart_Item.is_active == True, Cart_Item.product_id.not_in(list(additions)))
+            .values(quantity=0, is_active=False)
+            .execution_options(synchronize_session=False)
+        )
+
+    if removals:
+        quantity = Cart_Item.quantity + case(removals, value=Cart_Item.product_id)
+        await db.execute(
+            update(Cart_Item)
+            .where(Cart_Item.cart_id == cart.id, Cart_Item.is_active == True, Cart_Item.product_id.in_(list(removals)))
+            .values(quantity=case((quantity > 0, quantity), else_=0), is_active=quantity > 0)
+            .execution_options(synchronize_session=False)
+        )
+
+    if additions:
+        await upsert_cart_items(db, user.id, cart.id, additions, replace=cart_batch.replace)
+
+    await db.commit()
+
+    cart_items = (await db.execute(select(Cart_Item.product_id, Cart_Item.quantity).where(Cart_Item.cart_id == cart.id, Cart_Item.is_active == True).order_by(Cart_Item.product_id))).all()
+
+    return{
+        'status_code': status.HTTP_200_OK,
+        'transaction': 'Successful',
+        'cart_items': [
+            {
+                'product_id': cart_item.product_id,
+                'quantity': cart_item.quantity
+            }
+            for cart_item in cart_items
+        ]
+    }
+
+
+@router.post('/checkout', status_code=status.HTTP_201_CREATED)
+async def checkout(db: db_dependency, user: user_dependency):
+    cart_id = await db.scalar(select(Cart.id).where(Cart.user_id == user.id, Cart.is_active == True))
+
+    if cart_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail='Your cart is empty'
+        )
+
+    claimed = await db.scalar(
+        update(Cart)
+        .where(Cart.id == cart_id, Cart.is_active == True)
+        .values(is_active=False)
+        .returning(Cart.id)
+        .execution_options(synchronize_session=False)
+    )
 
+    if claimed is None:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail='This cart is already being checked out'
+        )
+
+    cart_items = (await db.execute(select(Cart_Item.product_id, Cart_Item.quantity).where(Cart_Item.cart_id == cart_id, Cart_Item.is_active == True, Cart_Item.quantity >= 1))).all()
+
+    if not cart_items:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail='Your cart is empty'
+        )
+
+    quantities = {}
+    for cart_item in cart_items:
+        quantities[cart_item.product_id] = quantities.get(cart_item.product_id, 0) + cart_item.quantity
+
+    order_items = []
+    product_slugs = []
+
+    for product_id in sorted(quantities):
+        reserved = (await db.execute(
+            update(Product)
+            .where(Product.id == product_id, Product.is_active == True, Product.stock >= quantities[product_id])
+            .values(stock=Product.stock - quantities[product_id])
+            .returning(Product.price, Product.slug)
+            .execution_options(synchronize_session=False)
+        )).first()
+
+        if reserved is None:
+            await db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f'Not enough stock for product {product_id}'
+            )
+
+        order_items.append(Order_Item(product_id=product_id, quantity=quantities[product_id], price=reserved.price))
+        product_slugs.append(reserved.slug)
+
+    order = Order(
+        user_id=user.id,
+        cart_id=cart_id,
+        total=sum(order_item.price * order_item.quantity for order_item in order_items),
+        order_items=order_items,
+    )
+    db.add(order)
+
+    await db.execute(update(Cart_Item).where(Cart_Item.cart_id == cart_id).values(is_active=False).execution_options(synchronize_session=False))
+    await db.commit()
+
+    for product_slug in product_slugs:
+        await invalidate_cached_response(product_detail_key(product_slug))
+
+    return{
+        'status_code': status.HTTP_201_CREATED,
+        'transaction': 'Successful',
+        'order': {
+            'id': order.id,
+            'total': order.total
+        }
+    }
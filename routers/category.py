@@ -1,31 +1,34 @@
 from fastapi import APIRouter, Depends, HTTPException
 from typing import Annotated, Optional
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
-from pydantic import BaseModel
-from database import SessionLocal
-from models.model_category import Category
-from .auth import get_current_user
+from pydantic import BaseModel, ConfigDict
+from database import get_db
+from models.model_category import Category, get_category_tree, load_category_tree
+from .auth import get_current_user, Principal
 
 
 router = APIRouter(prefix='/category', tags=['category'])
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+db_dependency = Annotated[AsyncSession, Depends(get_db)]
+user_dependency = Annotated[Principal, Depends(get_current_user)]
+
 
+class CreateCategory(BaseModel):
+    name: str
+    parent_id: Optional[int] = None
 
-db_dependency = Annotated[Session, Depends(get_db)]
-user_dependency = Annotated[dict, Depends(get_current_user)]
 
+class CategoryOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
 
-class CreateCategory(BaseModel):
+    id: int
     name: str
+    slug: str
     parent_id: Optional[int] = None
+    is_active: bool
 
 
 
@@ -33,16 +36,17 @@ class CreateCategory(BaseModel):
 async def create_category(db: db_dependency, user: user_dependency, create_category: CreateCategory):
     try:
         print(user)
-        if user.get('is_admin'):
+        if user.is_admin:
             category_model = Category(
                 name = create_category.name,
                 parent_id = create_category.parent_id,
             )
 
-            category_model.generate_slug(db)
+            await category_model.generate_slug(db)
 
             db.add(category_model)
-            db.commit()
+            await db.commit()
+            await load_category_tree(db)
 
             return{
                 'status_code': status.HTTP_201_CREATED,
@@ -59,9 +63,9 @@ async def create_category(db: db_dependency, user: user_dependency, create_categ
         }
 
 
-@router.get('/all_categories', status_code=status.HTTP_200_OK)
-async def get_all_categories(db: db_dependency):
-    categories = db.query(Category).filter(Category.is_active == True).all()
+@router.get('/all_categories', status_code=status.HTTP_200_OK, response_model=list[CategoryOut])
+async def get_all_categories():
+    categories = [category for category in get_category_tree().by_id.values() if category.is_active]
 
     if categories is not None:
         return categories
@@ -74,11 +78,11 @@ async def get_all_categories(db: db_dependency):
 
 @router.put('/update_category', status_code=status.HTTP_200_OK)
 async def update_category(db: db_dependency, user: user_dependency, category_id: int, update_category: CreateCategory):
-    category = db.query(Category).filter(Category.id == category_id).first()
+    category = await db.scalar(select(Category).where(Category.id == category_id))
     category_parent = category.parent_id
     category_name = category.name
 
-    if user.get('role') == 'admin':
+    if user.is_admin:
         if category is not None:
             category.name = update_category.name
             category.parent_id = update_category.parent_id
@@ -90,7 +94,8 @@ async def update_category(db: db_dependency, user: user_dependency, category_id:
                 category.name = category_name
 
             db.add(category)
-            db.commit()
+            await db.commit()
+            await load_category_tree(db)
 
             return{
                 'status_code': status.HTTP_200_OK,
@@ -110,9 +115,9 @@ async def update_category(db: db_dependency, user: user_dependency, category_id:
 
 @router.delete('/delete', status_code=status.HTTP_200_OK)
 async def delete_category(db: db_dependency, user: user_dependency, category_id: int):
-    category = db.query(Category).filter(Category.id == category_id).first()
+    category = await db.scalar(select(Category).where(Category.id == category_id))
 
-    if user.get('is_admin'):
+    if user.is_admin:
         if category is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -121,7 +126,8 @@ async def delete_category(db: db_dependency, user: user_dependency, category_id:
         
         category.is_active = False
         db.add(category)
-        db.commit()
+        await db.commit()
+        await load_category_tree(db)
 
         return{
             'status_code': status.HTTP_200_OK,
@@ -0,0 +1,76 @@
+from datetime import datetime, timezone
+from typing import Annotated, Optional
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from starlette import status
+from database import AsyncSessionLocal
+from models.model_cart import Cart_Item
+from models.model_product import Product, Comment, Rating
+from .auth import get_current_user, Principal
+import json
+import os
+import zlib
+
+
+router = APIRouter(prefix='/export', tags=['export'])
+
+
+user_dependency = Annotated[Principal, Depends(get_current_user)]
+
+
+EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', 1000))
+EXPORT_MODELS = {
+    'products': (Product, Product.updated_at),
+    'comments': (Comment, Comment.updated_at),
+    'ratings': (Rating, Rating.updated_at),
+    'cart_items': (Cart_Item, Cart_Item.updated_at),
+}
+
+
+def export_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+async def export_rows(query, compress: bool):
+    compressor = zlib.compressobj(wbits=31) if compress else None
+
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+
+        async for rows in result.partitions():
+            data = ''.join(json.dumps(row._asdict(), default=export_default) + '\n' for row in rows).encode()
+            yield compressor.compress(data) if compressor else data
+
+    if compressor:
+        yield compressor.flush()
+
+
+@router.get('/{model_name}', status_code=status.HTTP_200_OK)
+async def export_model(user: user_dependency, model_name: str, updated_since: Optional[datetime] = None, gzip: bool = False):
+    if not user.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail='You must be admin user for this'
+        )
+
+    if model_name not in EXPORT_MODELS:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail='Export not found'
+        )
+
+    model, updated_column = EXPORT_MODELS[model_name]
+    query = select(*model.__table__.columns).order_by(model.id)
+
+    if updated_since is not None:
+        if updated_since.tzinfo is not None:
+            updated_since = updated_since.astimezone(timezone.utc).replace(tzinfo=None)
+
+        query = query.where(updated_column >= updated_since)
+
+    headers = {'Content-Encoding': 'gzip'} if gzip else {}
+
+    return StreamingResponse(export_rows(query, gzip), media_type='application/x-ndjson', headers=headers)
@@ -0,0 +1,18 @@
+from fastapi import APIRouter
+from starlette import status
+from database import database_pool_status, read_replicas
+from instrumentation import sql_query_status
+from .auth import password_hash_queue_depth
+
+
+router = APIRouter(prefix='/metrics', tags=['metrics'])
+
+
+@router.get('/', status_code=status.HTTP_200_OK)
+async def get_metrics():
+    return {
+        'database_pool': database_pool_status(),
+        'read_replicas': read_replicas.status(),
+        'sql': sql_query_status(),
+        'password_hash_queue_depth': password_hash_queue_depth()
+    }
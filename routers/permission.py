@@ -1,32 +1,25 @@
 import stat
 from typing import Annotated
 from fastapi import APIRouter, Depends, HTTPException
-from database import SessionLocal
-from sqlalchemy.orm import Session
+from database import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
-from .auth import get_current_user
+from .auth import get_current_user, Principal, revoke_user_tokens
 from models.model_user import User
 
 
 router = APIRouter(prefix='/permission', tags=['permission'])
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-         db.close()
-
-
-db_dependency = Annotated[Session, Depends(get_db)]
-user_dependency = Annotated[dict, Depends(get_current_user)]
+db_dependency = Annotated[AsyncSession, Depends(get_db)]
+user_dependency = Annotated[Principal, Depends(get_current_user)]
 
 
 @router.patch('/', status_code=status.HTTP_200_OK)
 async def user_permission(db: db_dependency, get_user: user_dependency, user_id: int):
-    if get_user.get('is_admin'):
-        user = db.query(User).filter(User.id == user_id).first()
+    if get_user.is_admin:
+        user = await db.scalar(select(User).where(User.id == user_id))
 
         if not user:
             raise HTTPException(
@@ -37,7 +30,8 @@ async def user_permission(db: db_dependency, get_user: user_dependency, user_id:
         if user.is_supplier:
             user.is_supplier = False
             db.add(user)
-            db.commit()
+            await db.commit()
+            await revoke_user_tokens(user.id)
             return{
                 'status_code': status.HTTP_200_OK,
                 'detail': 'User is no longer supplier'
@@ -45,7 +39,8 @@ async def user_permission(db: db_dependency, get_user: user_dependency, user_id:
         else:
             user.is_supplier = True
             db.add(user)
-            db.commit()
+            await db.commit()
+            await revoke_user_tokens(user.id)
             return{
                 'status_code': status.HTTP_200_OK,
                 'detail': 'User is now supplier'
@@ -59,8 +54,8 @@ async def user_permission(db: db_dependency, get_user: user_dependency, user_id:
 
 @router.delete('/delete', status_code=status.HTTP_200_OK)
 async def delete_user(db: db_dependency, get_user: user_dependency, user_id: int):
-    if get_user.get('is_admin'):
-        user = db.query(User).filter(User.id == user_id).first()
+    if get_user.is_admin:
+        user = await db.scalar(select(User).where(User.id == user_id))
 
         if user.is_admin:
             raise HTTPException(
@@ -71,7 +66,8 @@ async def delete_user(db: db_dependency, get_user: user_dependency, user_id: int
         if user.is_active:
             user.is_active = False
             db.add(user)
-            db.commit()
+            await db.commit()
+            await revoke_user_tokens(user.id)
             return{
                 'status_code': status.HTTP_200_OK,
                 'detail': 'User is deleted'
@@ -79,7 +75,8 @@ async def delete_user(db: db_dependency, get_user: user_dependency, user_id: int
         else:
             user.is_active = True
             db.add(user)
-            db.commit()
+            await db.commit()
+            await revoke_user_tokens(user.id)
             return{
                 'status_code': status.HTTP_200_OK,
                 'detail': 'User is activated'
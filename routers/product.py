@@ -1,29 +1,44 @@
+from collections import Counter, deque
+from datetime import datetime
 from typing import Annotated, Optional
-from fastapi import APIRouter, Depends, HTTPException
-from pydantic import BaseModel, Field
-from database import SessionLocal
-from sqlalchemy.orm import Session
-from models.model_cart import Cart, Cart_Item
-from models.model_category import Category
-from .auth import get_current_user
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from pydantic import BaseModel, ConfigDict, Field, ValidationError
+from cache import get_cached_response, set_cached_response, invalidate_cached_response, make_etag
+from database import get_db, get_read_db, is_primary
+from sqlalchemy import Integer, case, cast, column, func, insert, literal_column, or_, select, table, tuple_, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from slugify import slugify
+from models.model_cart import get_active_cart, upsert_cart_items
+from models.model_category import Category, category_subtree_ids, get_category_tree
+from .auth import get_current_user, Principal
 from starlette import status
-from models.model_product import Product, Comment, Rating
+from models.model_product import Product, Comment, Rating, update_product_rating, PRODUCT_SEARCH_DOCUMENT
 from models.model_user import User
+import base64
+import codecs
+import csv
+import json
+import os
 
 
 router = APIRouter(prefix='/products', tags=['products'])
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+db_dependency = Annotated[AsyncSession, Depends(get_db)]
+read_db_dependency = Annotated[AsyncSession, Depends(get_read_db)]
+user_dependency = Annotated[Principal, Depends(get_current_user)]
 
 
-db_dependency = Annotated[Session, Depends(get_db)]
-user_dependency = Annotated[dict, Depends(get_current_user)]
+PRODUCT_PAGE_SIZE = int(os.getenv('PRODUCT_PAGE_SIZE', 50))
+PRODUCT_MAX_PAGE_SIZE = int(os.getenv('PRODUCT_MAX_PAGE_SIZE', 500))
+PRODUCT_FIELDS = {column.name for column in Product.__table__.columns}
+COMMENT_PAGE_SIZE = int(os.getenv('COMMENT_PAGE_SIZE', 20))
+COMMENT_MAX_PAGE_SIZE = int(os.getenv('COMMENT_MAX_PAGE_SIZE', 100))
+SEARCH_MAX_OFFSET = int(os.getenv('SEARCH_MAX_OFFSET', 1000))
+PRICE_FACET_BUCKETS = (0, 50, 100, 250, 500, 1000)
+IMPORT_CHUNK_SIZE = int(os.getenv('PRODUCT_IMPORT_CHUNK_SIZE', 1000))
+IMPORT_MAX_ERRORS = int(os.getenv('PRODUCT_IMPORT_MAX_ERRORS', 1000))
 
 
 class CreateProduct(BaseModel):
@@ -44,10 +59,192 @@ class CreateRating(BaseModel):
     rating: int = Field(ge=1, le=5, description='The rating must be between 1 and 5')
 
 
+class ProductOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    name: Optional[str] = None
+    slug: Optional[str] = None
+    description: Optional[str] = None
+    price: Optional[int] = None
+    image_url: Optional[str] = None
+    stock: Optional[int] = None
+    supplier_id: Optional[int] = None
+    category_id: Optional[int] = None
+    rating: Optional[float] = None
+    rating_sum: Optional[int] = None
+    rating_count: Optional[int] = None
+    is_active: Optional[bool] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+
+class ProductPage(BaseModel):
+    Products: list[ProductOut]
+    Next: Optional[int] = None
+
+
+class SearchProductOut(ProductOut):
+    rank: float
+
+
+class CategoryFacet(BaseModel):
+    category_id: Optional[int] = None
+    count: int
+
+
+class PriceFacet(BaseModel):
+    min_price: Optional[int] = None
+    count: int
+
+
+class RatingFacet(BaseModel):
+    rating: Optional[int] = None
+    count: int
+
+
+class SearchFacets(BaseModel):
+    Category: list[CategoryFacet]
+    Price: list[PriceFacet]
+    Rating: list[RatingFacet]
+
+
+class SearchPage(BaseModel):
+    Products: list[SearchProductOut]
+    Total: int
+    Facets: SearchFacets
+
+
+class CommentOut(BaseModel):
+    id: int
+    product_id: Optional[int] = None
+    user_id: Optional[int] = None
+    comment: Optional[str] = None
+    parent_id: Optional[int] = None
+    is_active: Optional[bool] = None
+    post_date: datetime
+    rating: Optional[int] = None
+    Replies: list['CommentOut'] = []
+
+
+class ProductDetail(BaseModel):
+    Product: ProductOut
+    Comments: list[CommentOut]
+    Next: Optional[str] = None
+
+
+def product_detail_key(product_slug: str):
+    return f'product-detail:{product_slug}'
+
+
+async def invalidate_product_detail(db: AsyncSession, product_id: int):
+    product_slug = await db.scalar(select(Product.slug).where(Product.id == product_id))
+
+    if product_slug:
+        await invalidate_cached_response(product_detail_key(product_slug))
+
+
+def encode_comment_cursor(post_date: datetime, comment_id: int):
+    return base64.urlsafe_b64encode(f'{post_date.isoformat()}|{comment_id}'.encode()).decode()
+
+
+def decode_comment_cursor(cursor: str):
+    try:
+        post_date, comment_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return datetime.fromisoformat(post_date), int(comment_id)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail='Invalid comment cursor'
+        )
+
+
+async def paginate_comments(db: AsyncSession, product_id: int, after: Optional[str], limit: int):
+    columns = Comment.__table__.columns
+    query = select(*columns).where(Comment.product_id == product_id, Comment.parent_id == None, Comment.is_active == True)
+
+    if after is not None:
+        query = query.where(tuple_(Comment.post_date, Comment.id) > tuple_(*decode_comment_cursor(after)))
+
+    roots = (await db.execute(query.order_by(Comment.post_date, Comment.id).limit(limit + 1))).all()
+    next_cursor = None
+
+    if len(roots) > limit:
+        roots = roots[:limit]
+        next_cursor = encode_comment_cursor(roots[-1].post_date, roots[-1].id)
+
+    comments = {root.id: {**root._asdict(), 'Replies': []} for root in roots}
+
+    if comments:
+        replies = select(*columns).where(Comment.parent_id.in_(list(comments)), Comment.is_active == True).cte('replies', recursive=True)
+        replies = replies.union_all(
+            select(*columns).where(Comment.parent_id == replies.c.id, Comment.is_active == True)
+        )
+        replies = (await db.execute(select(replies).order_by(replies.c.post_date, replies.c.id))).all()
+
+        comments.update({reply.id: {**reply._asdict(), 'Replies': []} for reply in replies})
+        for reply in replies:
+            comments[reply.parent_id]['Replies'].append(comments[reply.id])
+
+    return [comments[root.id] for root in roots], next_cursor
+
+
+def product_search_query(dialect_name: str, q: str):
+    columns = [Product.id, Product.name, Product.slug, Product.price, Product.image_url, Product.rating, Product.category_id]
+
+    if dialect_name == 'sqlite':
+        products_fts = table('products_fts', column('rowid'))
+        terms = ' '.join('"' + term.replace('"', '""') + '"' for term in q.split())
+
+        return (
+            select(*columns, (-func.bm25(literal_column('products_fts'))).label('rank'))
+            .join(products_fts, products_fts.c.rowid == Product.id)
+            .where(literal_column('products_fts').op('MATCH')(terms))
+        )
+
+    document = literal_column(PRODUCT_SEARCH_DOCUMENT)
+    ts_query = func.plainto_tsquery(literal_column("'english'"), q)
+
+    return select(*columns, func.ts_rank(document, ts_query).label('rank')).where(document.op('@@')(ts_query))
+
+
+async def paginate_products(db: AsyncSession, filters: list, after: Optional[int], limit: int, fields: Optional[str]):
+    if fields:
+        requested_fields = [field.strip() for field in fields.split(',') if field.strip()]
+        unknown_fields = set(requested_fields) - PRODUCT_FIELDS
+
+        if unknown_fields:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f'Unknown product fields: {", ".join(sorted(unknown_fields))}'
+            )
+
+        columns = [Product.id] + [getattr(Product, field) for field in dict.fromkeys(requested_fields) if field != 'id']
+    else:
+        columns = Product.__table__.columns
+
+    query = select(*columns)
+
+    if after is not None:
+        query = query.where(Product.id > after)
+
+    products = (await db.execute(query.where(*filters).order_by(Product.id).limit(limit + 1))).all()
+    next_cursor = None
+
+    if len(products) > limit:
+        products = products[:limit]
+        next_cursor = products[-1].id
+
+    return {
+        'Products': [product._asdict() for product in products],
+        'Next': next_cursor
+    }
+
+
 @router.post('/create', status_code=status.HTTP_201_CREATED)
 async def create_product(db: db_dependency, user: user_dependency, create_model: CreateProduct):
     try:
-        if user.get('is_admin') or user.get('is_supplier'):
+        if user.is_admin or user.is_supplier:
             product = Product(
             name = create_model.name,
             description = create_model.description,
@@ -58,10 +255,10 @@ async def create_product(db: db_dependency, user: user_dependency, create_model:
             )
 
             product.generate_slug()
-            product.supplier_id = user.get('id')
+            product.supplier_id = user.id
 
             db.add(product)
-            db.commit()
+            await db.commit()
 
             return{
                 'status_code': status.HTTP_201_CREATED,
@@ -79,12 +276,205 @@ async def create_product(db: db_dependency, user: user_dependency, create_model:
         }
 
 
-@router.get('/', status_code=status.HTTP_200_OK)
-async def all_products(db: db_dependency):
-    products = db.query(Product).filter(Product.is_active == True, Product.stock > 0).all()
+async def read_import_lines(request: Request):
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    buffer = ''
+
+    async for chunk in request.stream():
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split('\n')
+
+        for line in lines:
+            yield line.rstrip('\r')
+
+    buffer += decoder.decode(b'', final=True)
+    if buffer.strip():
+        yield buffer.rstrip('\r')
+
+
+class ImportLines:
+    def __init__(self):
+        self.lines = deque()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if not self.lines:
+            raise StopIteration
+
+        return self.lines.popleft()
+
+
+async def read_import_rows(request: Request):
+    is_csv = 'csv' in request.headers.get('content-type', '')
+    header = None
+    line_number = 0
+    csv_lines = ImportLines()
+    csv_rows = csv.reader(csv_lines)
+    record = []
+    record_line = 0
+    record_quotes = 0
+
+    async for line in read_import_lines(request):
+        line_number += 1
+
+        if not record and not line.strip():
+            continue
+
+        if not is_csv:
+            try:
+                yield line_number, json.loads(line), None
+            except ValueError as err:
+                yield line_number, None, str(err)
+            continue
+
+        if not record:
+            record_line = line_number
+        record.append(line + '\n')
+        record_quotes += line.count('"')
+
+        if record_quotes % 2:
+            continue
+
+        csv_lines.lines.extend(record)
+        record = []
+        record_quotes = 0
+
+        try:
+            values = next(csv_rows)
+        except csv.Error as err:
+            yield record_line, None, str(err)
+            continue
+
+        if header is None:
+            header = [value.strip() for value in values]
+            continue
+
+        yield record_line, dict(zip(header, values)), None
+
+    if record:
+        yield record_line, None, 'Unterminated quoted field'
+
+
+async def resolve_import_slugs(db: AsyncSession, names: list):
+    base_slugs = [slugify(name) for name in names]
+    slug_counts = Counter(base_slugs)
+
+    taken = set((await db.scalars(select(Product.slug).where(Product.slug.in_(slug_counts)))).all())
+    collided = {base_slug for base_slug, count in slug_counts.items() if base_slug in taken or count > 1}
+
+    if collided:
+        taken.update((await db.scalars(select(Product.slug).where(or_(*[Product.slug.like(f'{base_slug}-%') for base_slug in collided])))).all())
+
+    slugs = []
+    for base_slug in base_slugs:
+        slug = base_slug
+        suffix = 1
+
+        while slug in taken:
+            suffix += 1
+            slug = f'{base_slug}-{suffix}'
+
+        taken.add(slug)
+        slugs.append(slug)
+
+    return slugs
+
+
+async def import_product_chunk(db: AsyncSession, rows: list, supplier_id: int, errors: list):
+    category_ids = {create_model.category for _, create_model in rows}
+    known_category_ids = category_ids & get_category_tree().by_id.keys()
+
+    if category_ids - known_category_ids:
+        known_category_ids |= set((await db.scalars(select(Category.id).where(Category.id.in_(category_ids - known_category_ids)))).all())
+
+    valid_rows = []
+    for line_number, create_model in rows:
+        if create_model.category in known_category_ids:
+            valid_rows.append((line_number, create_model))
+        else:
+            errors.append({'row': line_number, 'error': f'Category {create_model.category} not found'})
+
+    if not valid_rows:
+        return 0
+
+    slugs = await resolve_import_slugs(db, [create_model.name for _, create_model in valid_rows])
+
+    try:
+        await db.execute(insert(Product), [
+            {
+                'name': create_model.name,
+                'slug': slug,
+                'description': create_model.description,
+                'price': create_model.price,
+                'image_url': create_model.image_url,
+                'stock': create_model.stock,
+                'category_id': create_model.category,
+                'supplier_id': supplier_id,
+                'is_active': True,
+            }
+            for (_, create_model), slug in zip(valid_rows, slugs)
+        ])
+        await db.commit()
+    except SQLAlchemyError as err:
+        await db.rollback()
+        errors.extend({'row': line_number, 'error': str(err.__cause__ or err)} for line_number, _ in valid_rows)
+        return 0
+
+    return len(valid_rows)
+
+
+@router.post('/import', status_code=status.HTTP_201_CREATED)
+async def import_products(db: db_dependency, user: user_dependency, request: Request):
+    if not (user.is_admin or user.is_supplier):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail='You are not authorized for this method'
+        )
+
+    imported = 0
+    failed = 0
+    errors = []
+    chunk = []
+
+    async for line_number, row, error in read_import_rows(request):
+        if error is None:
+            try:
+                chunk.append((line_number, CreateProduct(**row)))
+            except (ValidationError, TypeError) as err:
+                error = '; '.join(f"{'.'.join(map(str, detail['loc']))}: {detail['msg']}" for detail in err.errors()) if isinstance(err, ValidationError) else str(err)
+
+        if error is not None:
+            errors.append({'row': line_number, 'error': error})
+
+        if len(chunk) >= IMPORT_CHUNK_SIZE:
+            imported += await import_product_chunk(db, chunk, user.id, errors)
+            chunk = []
+
+        if len(errors) > IMPORT_MAX_ERRORS:
+            failed += len(errors) - IMPORT_MAX_ERRORS
+            del errors[IMPORT_MAX_ERRORS:]
+
+    if chunk:
+        imported += await import_product_chunk(db, chunk, user.id, errors)
+
+    failed += len(errors)
+
+    return {
+        'status_code': status.HTTP_201_CREATED,
+        'Imported': imported,
+        'Failed': failed,
+        'Errors': errors[:IMPORT_MAX_ERRORS]
+    }
+
+
+@router.get('/', status_code=status.HTTP_200_OK, response_model=ProductPage, response_model_exclude_unset=True)
+async def all_products(db: read_db_dependency, after: Optional[int] = None, limit: int = Query(PRODUCT_PAGE_SIZE, ge=1, le=PRODUCT_MAX_PAGE_SIZE), fields: Optional[str] = None):
+    products = await paginate_products(db, [Product.is_active == True, Product.stock > 0], after, limit, fields)
     
-    if not products:
-        return HTTPException(
+    if not products['Products'] and after is None:
+        raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail='There are no product'
         )
@@ -92,79 +482,143 @@ async def all_products(db: db_dependency):
     return products
 
 
-@router.get('/{category_slug}', status_code=status.HTTP_200_OK)
-async def product_by_category(db: db_dependency, category_slug: str):
-    category = db.query(Category).filter(Category.slug == category_slug).first()
+@router.get('/search', status_code=status.HTTP_200_OK, response_model=SearchPage, response_model_exclude_unset=True)
+async def search_products(db: read_db_dependency, q: str = Query(min_length=1), category: Optional[str] = None, min_price: Optional[int] = None, max_price: Optional[int] = None, min_rating: Optional[float] = None, limit: int = Query(PRODUCT_PAGE_SIZE, ge=1, le=PRODUCT_MAX_PAGE_SIZE), offset: int = Query(0, ge=0, le=SEARCH_MAX_OFFSET)):
+    if not q.strip():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail='Search query must not be blank'
+        )
+
+    filters = [Product.is_active == True, Product.stock > 0]
 
-    if not category:  
+    if category:
+        category_tree = get_category_tree()
+        category_node = category_tree.by_slug.get(category)
+
+        if not category_node:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail='Category not found'
+            )
+
+        filters.append(Product.category_id.in_(category_tree.descendant_ids[category_node.id]))
+
+    if min_price is not None:
+        filters.append(Product.price >= min_price)
+
+    if max_price is not None:
+        filters.append(Product.price <= max_price)
+
+    if min_rating is not None:
+        filters.append(Product.rating >= min_rating)
+
+    matches = product_search_query(db.bind.dialect.name, q).where(*filters).cte('matches')
+
+    products = (await db.execute(select(matches).order_by(matches.c.rank.desc(), matches.c.id).limit(limit).offset(offset))).all()
+
+    price_bucket = case(*[(matches.c.price >= bucket, bucket) for bucket in reversed(PRICE_FACET_BUCKETS)], else_=None)
+    rating_bucket = cast(matches.c.rating, Integer)
+    facet_rows = (await db.execute(
+        select(matches.c.category_id, price_bucket.label('price'), rating_bucket.label('rating'), func.count().label('count'))
+        .group_by(matches.c.category_id, price_bucket, rating_bucket)
+    )).all()
+
+    facets = {'Category': {}, 'Price': {}, 'Rating': {}}
+    for row in facet_rows:
+        facets['Category'][row.category_id] = facets['Category'].get(row.category_id, 0) + row.count
+        facets['Price'][row.price] = facets['Price'].get(row.price, 0) + row.count
+        facets['Rating'][row.rating] = facets['Rating'].get(row.rating, 0) + row.count
+
+    return {
+        'Products': products,
+        'Total': sum(facets['Category'].values()),
+        'Facets': {
+            'Category': [{'category_id': key, 'count': count} for key, count in facets['Category'].items()],
+            'Price': [{'min_price': key, 'count': count} for key, count in sorted(facets['Price'].items(), key=lambda item: (item[0] is None, item[0]))],
+            'Rating': [{'rating': key, 'count': count} for key, count in sorted(facets['Rating'].items(), key=lambda item: (item[0] is None, item[0]))],
+        }
+    }
+
+
+@router.get('/{category_slug}', status_code=status.HTTP_200_OK, response_model=ProductPage, response_model_exclude_unset=True)
+async def product_by_category(db: read_db_dependency, category_slug: str, after: Optional[int] = None, limit: int = Query(PRODUCT_PAGE_SIZE, ge=1, le=PRODUCT_MAX_PAGE_SIZE), fields: Optional[str] = None):
+    category_tree = get_category_tree()
+    category = category_tree.by_slug.get(category_slug)
+
+    if category:
+        category_ids = category_tree.descendant_ids[category.id]
+    else:
+        category_id = await db.scalar(select(Category.id).where(Category.slug == category_slug))
+        category_ids = category_subtree_ids(category_id) if category_id else None
+
+    if category_ids is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail='Category not found'
         )
     
-    products = []
-    categories_to_process = [category]
+    products = await paginate_products(db, [Product.category_id.in_(category_ids), Product.is_active == True, Product.stock > 0], after, limit, fields)
 
-    while categories_to_process:
-        current_category = categories_to_process.pop()
+    return products
 
-        products.extend(db.query(Product).filter(Product.category_id == current_category.id, Product.is_active == True, Product.stock > 0))
 
-        subcategories = db.query(Category).filter(Category.parent_id == current_category.id).all()
+@router.get('/detail/{product_slug}', status_code=status.HTTP_200_OK, response_model=ProductDetail)
+async def product_detail(db: read_db_dependency, request: Request, product_slug: str, comments_after: Optional[str] = None, comments_limit: int = Query(COMMENT_PAGE_SIZE, ge=1, le=COMMENT_MAX_PAGE_SIZE)):
+    cache_key = product_detail_key(product_slug)
+    is_first_page = comments_after is None and comments_limit == COMMENT_PAGE_SIZE
+    cached_response = await get_cached_response(cache_key) if is_first_page else None
 
-        categories_to_process.extend(subcategories)
+    if cached_response:
+        etag, body = cached_response
+    else:
+        product = (await db.execute(select(*Product.__table__.columns).where(Product.slug == product_slug, Product.is_active == True, Product.stock > 0))).first()
 
-    return products
+        if not product:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail='Product not found'
+            )
+        
+        comments, next_cursor = await paginate_comments(db, product.id, comments_after, comments_limit)
 
+        body = ProductDetail.model_validate({
+            'Product': product,
+            'Comments': comments,
+            'Next': next_cursor
+        }, from_attributes=True).model_dump_json().encode()
 
-@router.get('/detail/{product_slug}', status_code=status.HTTP_200_OK)
-async def product_detail(db: db_dependency, product_slug: str):
-    product = db.query(Product).filter(Product.slug == product_slug, Product.is_active == True, Product.stock > 0).first()
-    comments = db.query(Comment).filter(Comment.product_id == product.id, Comment.is_active == True).order_by('post_date').all()
-    
+        if is_first_page and is_primary(db):
+            etag = await set_cached_response(cache_key, body)
+        else:
+            etag = make_etag(body)
+
+    if etag in [tag.strip() for tag in request.headers.get('if-none-match', '').split(',')]:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+    return Response(content=body, media_type='application/json', headers={'ETag': etag})
+
+
+@router.post('/detail/{product_slug}', status_code=status.HTTP_200_OK)
+async def add_cart(db: db_dependency, user: user_dependency, product_slug: str, itm_quantity: int):
+    product = (await db.execute(select(Product.id).where(Product.slug == product_slug, Product.is_active == True, Product.stock > 0))).first()
 
     if not product:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail='Product not found'
         )
-    
-    return {
-        'Product': product,
-        'Comments': comments
-    }
-
-
-@router.post('/detail/{product_slug}', status_code=status.HTTP_200_OK)
-async def add_cart(db: db_dependency, user: user_dependency, product_slug: str, itm_quantity: int):
-    product = db.query(Product).filter(Product.slug == product_slug, Product.is_active == True, Product.stock > 0).first()
-    cart = db.query(Cart).filter(Cart.is_active == True).join(Cart_Item).filter(Cart_Item.user_id == user.get('id')).first()
 
-    if not cart:
-        cart = Cart()
-        db.add(cart)
-        db.commit()
-    
-    cart_item = db.query(Cart_Item).filter(Cart_Item.cart_id == cart.id, Cart_Item.product_id == product.id, Cart_Item.is_active == True).first()
+    cart = await get_active_cart(db, user.id)
 
-    if cart_item:
-        cart_item.quantity += itm_quantity
-    else:
-        cart_item = Cart_Item(
-            user_id = user.get('id'),
-            product_id = product.id,
-            quantity = itm_quantity,
-            cart_id = cart.id,
-        )
-        db.add(cart_item)
-    
-    db.commit()
+    cart_item, = await upsert_cart_items(db, user.id, cart.id, {product.id: itm_quantity})
+    await db.commit()
 
     return{
         'status_code': status.HTTP_200_OK,
         'transaction': 'Successful',
         'cart_item': {
-            'product_id': cart_item.product_id,
+            'product_id': product.id,
             'quantity': cart_item.quantity
         }
     }
@@ -172,16 +626,16 @@ async def add_cart(db: db_dependency, user: user_dependency, product_slug: str,
 
 @router.post('/detail/{product_slug}/comment', status_code=status.HTTP_201_CREATED)
 async def create_comment(db: db_dependency, user: user_dependency, product_slug: str, create_comment: CreateComment, create_rating: CreateRating):
-    product = db.query(Product).filter(Product.slug == product_slug, Product.is_active == True, Product.stock > 0).first()
+    product = await db.scalar(select(Product).where(Product.slug == product_slug, Product.is_active == True, Product.stock > 0))
     try:
         comment = Comment(
             comment = create_comment.comment,
             parent_id = create_comment.parent_id
         )
         comment.product_id = product.id
-        comment.user_id = user.get('id')
+        comment.user_id = user.id
 
-        the_comment = db.query(Comment).filter(Comment.user_id == comment.user_id, Comment.product_id == comment.product_id, Comment.parent_id == None, Comment.is_active == True).first()
+        the_comment = await db.scalar(select(Comment).where(Comment.user_id == comment.user_id, Comment.product_id == comment.product_id, Comment.parent_id == None, Comment.is_active == True))
 
         if not the_comment:
             rating = Rating(
@@ -189,29 +643,19 @@ async def create_comment(db: db_dependency, user: user_dependency, product_slug:
             )
 
             rating.product_id = product.id
-            rating.user_id = user.get('id')
+            rating.user_id = user.id
 
             comment.rating = rating.rating
 
             db.add(comment)
-            db.commit()
+            await db.flush()
 
             rating.comment_id = comment.id
 
             db.add(rating)
-            db.commit()
-
-            ratings = db.query(Rating).filter(Rating.product_id == product.id, Rating.is_active == True).all()
-            result = 0
-            for rating in ratings:
-                result += rating.rating
-
-            result = result/len(ratings)
-
-            product.rating = result
-
-            db.add(product)
-            db.commit()
+            await db.execute(update_product_rating(product.id, rating.rating, 1))
+            await db.commit()
+            await invalidate_cached_response(product_detail_key(product.slug))
 
             return{
                 'status_code': status.HTTP_201_CREATED,
@@ -221,7 +665,8 @@ async def create_comment(db: db_dependency, user: user_dependency, product_slug:
         else:
             if comment.parent_id is not None:
                 db.add(comment)
-                db.commit()
+                await db.commit()
+                await invalidate_cached_response(product_detail_key(product.slug))
 
                 return{
                     'status_code': status.HTTP_201_CREATED,
@@ -232,6 +677,7 @@ async def create_comment(db: db_dependency, user: user_dependency, product_slug:
                     'detail': 'You cannot comment two times. You can answere another comment'
                 }
     except Exception as err:
+        await db.rollback()
         return{
             'error': str(err)
         }
@@ -239,12 +685,13 @@ async def create_comment(db: db_dependency, user: user_dependency, product_slug:
 
 @router.patch('/detail/{product_slug}/comment', status_code=status.HTTP_200_OK)
 async def update_comment(db: db_dependency, user: user_dependency, comment_id: int, update_comment: CreateComment):
-    comment = db.query(Comment).filter(Comment.id == comment_id).first()
+    comment = await db.scalar(select(Comment).where(Comment.id == comment_id))
     if comment:
-        if user.get('id') == comment.user_id or user.get('is_admin'):
+        if user.id == comment.user_id or user.is_admin:
             comment.comment = update_comment.comment
             db.add(comment)
-            db.commit()
+            await db.commit()
+            await invalidate_product_detail(db, comment.product_id)
 
             return{
                 'status_code': status.HTTP_200_OK,
@@ -255,32 +702,21 @@ async def update_comment(db: db_dependency, user: user_dependency, comment_id: i
 
 @router.delete('/comment/delete', status_code=status.HTTP_200_OK)
 async def delete_comment(db: db_dependency, user: user_dependency, comment_id: int):
-    comment = db.query(Comment).filter(Comment.id == comment_id, Comment.is_active == True).first()
+    comment = await db.scalar(select(Comment).where(Comment.id == comment_id, Comment.is_active == True))
     if comment:
-        if user.get('id') == comment.user_id or user.get('is_admin'):
+        if user.id == comment.user_id or user.is_admin:
             comment.is_active = False
             db.add(comment)
-            db.commit()
 
-            rating = db.query(Rating).filter(Rating.product_id == comment.product_id, Rating.comment_id == comment.id).first()
-            rating.is_active = False
-            db.add(rating)
-            db.commit()
-            product = db.query(Product).filter(Product.id == comment.product_id).first()
+            rating = await db.scalar(select(Rating).where(Rating.product_id == comment.product_id, Rating.comment_id == comment.id, Rating.is_active == True))
 
-            ratings = db.query(Rating).filter(Rating.product_id == comment.product_id, Rating.is_active == True).all()
+            if rating:
+                rating.is_active = False
+                db.add(rating)
+                await db.execute(update_product_rating(comment.product_id, -rating.rating, -1))
 
-
-            result = 0
-            for rate in ratings:
-                result += rate.rating
-
-            result = result/len(ratings)
-
-            product.rating = result
-
-            db.add(product)
-            db.commit()
+            await db.commit()
+            await invalidate_product_detail(db, comment.product_id)
 
             return{
                 'status_code': status.HTTP_200_OK,
@@ -300,19 +736,19 @@ async def delete_comment(db: db_dependency, user: user_dependency, comment_id: i
 
 
 
-@router.get('/supplier/{user_id}', status_code=status.HTTP_200_OK)
-async def product_by_supplier(db: db_dependency, user_id: int):
-    user = db.query(User).filter(User.id == user_id).first()
+@router.get('/supplier/{user_id}', status_code=status.HTTP_200_OK, response_model=ProductPage, response_model_exclude_unset=True)
+async def product_by_supplier(db: read_db_dependency, user_id: int, after: Optional[int] = None, limit: int = Query(PRODUCT_PAGE_SIZE, ge=1, le=PRODUCT_MAX_PAGE_SIZE), fields: Optional[str] = None):
+    supplier_id = await db.scalar(select(User.id).where(User.id == user_id))
 
-    if not user:
+    if not supplier_id:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail='Supplier not found'
         )
 
-    products = db.query(Product).filter(Product.supplier_id == user_id, Product.is_active == True, Product.stock > 0).all()
+    products = await paginate_products(db, [Product.supplier_id == user_id, Product.is_active == True, Product.stock > 0], after, limit, fields)
 
-    if not products:
+    if not products['Products'] and after is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail='Product not found'
@@ -324,8 +760,8 @@ async def product_by_supplier(db: db_dependency, user_id: int):
 
 @router.delete('/delete', status_code=status.HTTP_200_OK)
 async def delete_product(db: db_dependency, user: user_dependency, product_id: int):
-    product = db.query(Product).filter(Product.id == product_id, Product.is_active == True).first()
-    if user.get('id') == product.supplier_id or user.get('is_admin'):
+    product = await db.scalar(select(Product).where(Product.id == product_id, Product.is_active == True))
+    if user.id == product.supplier_id or user.is_admin:
 
         if not product:
             raise HTTPException(
@@ -336,7 +772,8 @@ async def delete_product(db: db_dependency, user: user_dependency, product_id: i
         product.is_active = False
 
         db.add(product)
-        db.commit()
+        await db.commit()
+        await invalidate_cached_response(product_detail_key(product.slug))
 
         return{
             'status_code': status.HTTP_200_OK,
@@ -1,28 +1,21 @@
 from typing import Annotated
 from fastapi import APIRouter, Depends, HTTPException
-from pydantic import BaseModel
-from sqlalchemy.orm import Session
-from database import SessionLocal
+from pydantic import BaseModel, Field
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_db
+from models.model_product import Product
 from models.model_user import User
-from routers.auth import get_current_user
+from routers.auth import get_current_user, Principal, hash_password, verify_password
+from routers.product import ProductOut
 from starlette import status
-from passlib.context import CryptContext
 
 
 router = APIRouter(prefix='/profile', tags=['profile'])
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
-db_dependency = Annotated[Session, Depends(get_db)]
-user_dependency = Annotated[dict, Depends(get_current_user)]
-bcrypt_context = CryptContext(schemes=['bcrypt'], deprecated='auto')
+db_dependency = Annotated[AsyncSession, Depends(get_db)]
+user_dependency = Annotated[Principal, Depends(get_current_user)]
 
 
 class PasswordVerification(BaseModel):
@@ -30,9 +23,16 @@ class PasswordVerification(BaseModel):
     new_password: str
 
 
-@router.get('/', status_code=status.HTTP_200_OK)
+class Profile(BaseModel):
+    full_name: str = Field(alias='Full Name')
+    username: str = Field(alias='Username')
+    email: str = Field(alias='E-mail')
+    products: list[ProductOut] = Field(alias='Products')
+
+
+@router.get('/', status_code=status.HTTP_200_OK, response_model=Profile)
 async def profile(db: db_dependency, get_user: user_dependency):
-    user = db.query(User).filter(User.id == get_user.get('id'), User.is_active == True).first()
+    user = (await db.execute(select(User.first_name, User.last_name, User.username, User.email).where(User.id == get_user.id, User.is_active == True))).first()
 
     if not user:
         raise HTTPException(
@@ -44,7 +44,7 @@ async def profile(db: db_dependency, get_user: user_dependency):
         'Full Name': f'{user.first_name} {user.last_name}',
         'Username': user.username,
         'E-mail': user.email,
-        'Products': user.products        
+        'Products': (await db.execute(select(*Product.__table__.columns).where(Product.supplier_id == get_user.id).order_by(Product.id))).all()
     }
 
 
@@ -56,18 +56,18 @@ async def change_password(db: db_dependency, get_user: user_dependency, pwd_veri
             detail='Authentication faild'
         )
     
-    user = db.query(User).filter(User.id == get_user.get('id')).first()
+    user = await db.scalar(select(User).where(User.id == get_user.id))
 
-    if not bcrypt_context.verify(pwd_verification.password, user.hashed_password):
+    if not await verify_password(pwd_verification.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail='Error on password change'
         )
     
-    user.hashed_password = bcrypt_context.hash(pwd_verification.new_password)
+    user.hashed_password = await hash_password(pwd_verification.new_password)
 
     db.add(user)
-    db.commit()
+    await db.commit()
 
     return {
         'status_code': status.HTTP_200_OK,
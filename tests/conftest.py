@@ -0,0 +1,215 @@
+import multiprocessing
+import os
+import tempfile
+
+
+TEST_DATABASE_URL = os.getenv('TEST_DATABASE_URL', f'sqlite:///{os.path.join(tempfile.mkdtemp(), "ecommerce-test.db")}')
+
+os.environ['SQLALCHEMY_DATABASE_URL'] = TEST_DATABASE_URL
+os.environ.pop('SQLALCHEMY_ASYNC_DATABASE_URL', None)
+os.environ.pop('REPLICA_DATABASE_URLS', None)
+os.environ.pop('REDIS_URL', None)
+os.environ['SQL_DEBUG_HEADERS'] = 'true'
+os.environ['SQL_QUERY_BUDGET'] = '20'
+os.environ['SQL_QUERY_BUDGET_STRICT'] = 'true'
+os.environ['SQL_ROUTE_BUDGETS'] = 'GET /cart/=2,GET /products/=2,GET /products/{category_slug}=3,GET /products/detail/{product_slug}=4'
+os.environ.setdefault('SECRET_KEY', 'test-secret-key-not-for-production')
+os.environ.setdefault('ALGORITHM', 'HS256')
+
+WORKER_ENVIRONMENT = dict(os.environ)
+
+from sqlalchemy import insert
+import anyio
+import httpx
+import pytest
+import cache
+import instrumentation
+import main
+from database import AsyncSessionLocal, Base, async_engine, engine
+from models.model_cart import Cart, Cart_Item
+from models.model_category import Category, load_category_tree
+from models.model_product import Product
+from models.model_user import User
+from routers import auth
+from workers import run_worker
+
+
+PASSWORD_HASH = auth.bcrypt_context.hash('password')
+
+
+@pytest.fixture
+def anyio_backend():
+    return 'asyncio'
+
+
+@pytest.fixture
+async def client(anyio_backend, monkeypatch):
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    auth.token_cache.clear()
+    auth.revoked_users.clear()
+    auth.revocation_checks.clear()
+    monkeypatch.setattr(cache, 'response_cache', cache.MemoryCache(cache.RESPONSE_CACHE_SIZE, cache.RESPONSE_CACHE_TTL))
+    monkeypatch.setattr(cache, 'revocation_cache', cache.MemoryCache(cache.REVOCATION_CACHE_SIZE, cache.RESPONSE_CACHE_TTL))
+    monkeypatch.setattr(instrumentation, 'route_query_stats', {})
+
+    async with main.app.router.lifespan_context(main.app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url='http://test') as client:
+            yield client
+
+    await async_engine.dispose()
+
+
+@pytest.fixture
+async def db(client):
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+@pytest.fixture
+def query_budget(monkeypatch):
+    monkeypatch.setattr(instrumentation, 'route_query_budgets', dict(instrumentation.route_query_budgets))
+
+    def query_budget(route_key: str, budget: int):
+        instrumentation.route_query_budgets[route_key] = budget
+
+    return query_budget
+
+
+def auth_headers(user_id: int, username: str, is_admin: bool = False, is_supplier: bool = False, is_customer: bool = True):
+    token = auth.create_access_token(username, user_id, is_admin, is_supplier, is_customer, auth.ACCESS_TOKEN_EXPIRE)
+    return {'Authorization': f'Bearer {token}'}
+
+
+@pytest.fixture
+def make_user(db):
+    async def make_user(username: str, is_admin: bool = False, is_supplier: bool = False):
+        user_id = (await db.execute(insert(User).values(
+            username=username,
+            email=f'{username}@example.com',
+            first_name=username,
+            last_name='Test',
+            hashed_password=PASSWORD_HASH,
+            is_admin=is_admin,
+            is_supplier=is_supplier,
+            is_customer=not is_supplier,
+        ).returning(User.id))).scalar_one()
+        await db.commit()
+
+        return user_id, auth_headers(user_id, username, is_admin, is_supplier, not is_supplier)
+
+    return make_user
+
+
+@pytest.fixture
+def make_category(db):
+    async def make_category(name: str = 'Phones', parent_id: int = None):
+        category_id = (await db.execute(insert(Category).values(name=name, slug=name.lower().replace(' ', '-'), parent_id=parent_id, is_active=True).returning(Category.id))).scalar_one()
+        await db.commit()
+        await load_category_tree(db)
+
+        return category_id
+
+    return make_category
+
+
+@pytest.fixture
+def make_products(db):
+    async def make_products(supplier_id: int, category_id: int, count: int = 1, stock: int = 100, name: str = 'Product'):
+        product_ids = (await db.execute(insert(Product).returning(Product.id), [
+            {
+                'name': f'{name} {index}',
+                'slug': f'{name.lower()}-{index}',
+                'description': f'Description of {name.lower()} {index}',
+                'price': 10 + index,
+                'image_url': f'https://example.com/{index}.jpg',
+                'stock': stock,
+                'supplier_id': supplier_id,
+                'category_id': category_id,
+                'is_active': True,
+            }
+            for index in range(count)
+        ])).scalars().all()
+        await db.commit()
+
+        return list(product_ids)
+
+    return make_products
+
+
+@pytest.fixture
+def make_cart(db):
+    async def make_cart(user_id: int, quantities: dict):
+        cart_id = (await db.execute(insert(Cart).values(user_id=user_id, is_active=True).returning(Cart.id))).scalar_one()
+        if quantities:
+            await db.execute(insert(Cart_Item), [
+                {'user_id': user_id, 'product_id': product_id, 'quantity': quantity, 'cart_id': cart_id, 'is_active': True}
+                for product_id, quantity in quantities.items()
+            ])
+        await db.commit()
+
+        return cart_id
+
+    return make_cart
+
+
+class FakeRedis:
+    def __init__(self):
+        self.values = {}
+        self.now = 0.0
+
+    async def get(self, key: str):
+        value, expires_at = self.values.get(key, (None, None))
+
+        if expires_at is not None and expires_at <= self.now:
+            del self.values[key]
+            return None
+
+        return value
+
+    async def set(self, key: str, value: bytes, ex: int = None):
+        self.values[key] = (value, None if ex is None else self.now + ex)
+
+    async def delete(self, *keys: str):
+        return sum(self.values.pop(key, None) is not None for key in keys)
+
+
+@pytest.fixture
+def fake_redis(client, monkeypatch):
+    redis = FakeRedis()
+    monkeypatch.setattr(cache, 'response_cache', cache.RedisCache(redis, cache.RESPONSE_CACHE_TTL))
+    monkeypatch.setattr(cache, 'revocation_cache', cache.RedisCache(redis, cache.RESPONSE_CACHE_TTL))
+
+    return redis
+
+
+WORKER_TIMEOUT = 120
+
+
+def run_in_workers(request_groups: list):
+    context = multiprocessing.get_context('spawn')
+    barrier = context.Barrier(len(request_groups))
+    results = context.Queue()
+    processes = [context.Process(target=run_worker, args=(WORKER_ENVIRONMENT, barrier, results, requests)) for requests in request_groups]
+
+    for process in processes:
+        process.start()
+
+    try:
+        outcomes = [results.get(timeout=WORKER_TIMEOUT) for _ in processes]
+    finally:
+        for process in processes:
+            process.join(WORKER_TIMEOUT)
+
+    errors = [result for outcome, result in outcomes if outcome == 'error']
+    assert not errors, errors[0]
+
+    return [response for _, responses in outcomes for response in responses]
+
+
+@pytest.fixture
+def workers(client):
+    async def workers(request_groups: list):
+        return await anyio.to_thread.run_sync(run_in_workers, request_groups)
+
+    return workers
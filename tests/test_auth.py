@@ -0,0 +1,69 @@
+from datetime import datetime, timedelta
+from jose import jwt
+import pytest
+import cache
+from routers import auth
+
+
+pytestmark = pytest.mark.anyio
+
+
+def token_issued_at(user_id: int, username: str, issued: datetime):
+    return jwt.encode({'sub': username, 'id': user_id, 'is_admin': False, 'is_supplier': False, 'is_customer': True, 'iat': issued, 'exp': issued + auth.ACCESS_TOKEN_EXPIRE}, auth.SECRET_KEY, algorithm=auth.ALGORITHM)
+
+
+def bearer(token: str):
+    return {'Authorization': f'Bearer {token}'}
+
+
+async def test_token_issued_just_before_revocation_is_rejected(client, make_user):
+    user_id, _ = await make_user('customer')
+    token = auth.create_access_token('customer', user_id, False, False, True, auth.ACCESS_TOKEN_EXPIRE)
+    assert (await client.get('/cart/', headers=bearer(token))).status_code == 200
+
+    await auth.revoke_user_tokens(user_id)
+
+    assert (await client.get('/cart/', headers=bearer(token))).status_code == 401
+
+
+async def test_token_issued_after_revocation_is_accepted(client, make_user):
+    user_id, _ = await make_user('customer')
+    await auth.revoke_user_tokens(user_id)
+
+    reissued = auth.create_access_token('customer', user_id, False, False, True, auth.ACCESS_TOKEN_EXPIRE)
+
+    assert (await client.get('/cart/', headers=bearer(reissued))).status_code == 200
+
+
+async def test_whole_second_token_from_the_revocation_second_is_rejected(client, make_user):
+    user_id, _ = await make_user('customer')
+    await auth.revoke_user_tokens(user_id)
+    same_second = token_issued_at(user_id, 'customer', datetime.utcfromtimestamp(int(auth.revoked_users[user_id])))
+
+    assert (await client.get('/cart/', headers=bearer(same_second))).status_code == 401
+
+
+async def test_revocation_from_another_worker_reaches_cached_tokens(client, make_user, fake_redis):
+    user_id, _ = await make_user('customer')
+    earlier = token_issued_at(user_id, 'customer', datetime.utcnow() - timedelta(seconds=5))
+    assert (await client.get('/cart/', headers=bearer(earlier))).status_code == 200
+
+    await auth.revoke_user_tokens(user_id)
+    auth.revoked_users.clear()
+    auth.revocation_checks.clear()
+    auth.token_cache.clear()
+    assert (await client.get('/cart/', headers=bearer(earlier))).status_code == 401
+
+
+async def test_response_cache_churn_does_not_evict_revocations(client, make_user, monkeypatch):
+    monkeypatch.setattr(cache, 'response_cache', cache.MemoryCache(1, cache.RESPONSE_CACHE_TTL))
+    user_id, _ = await make_user('customer')
+    earlier = token_issued_at(user_id, 'customer', datetime.utcnow() - timedelta(seconds=5))
+
+    await auth.revoke_user_tokens(user_id)
+    for index in range(3):
+        await cache.set_cached_response(f'product-detail:product-{index}', b'{}')
+    auth.revoked_users.clear()
+    auth.revocation_checks.clear()
+
+    assert (await client.get('/cart/', headers=bearer(earlier))).status_code == 401
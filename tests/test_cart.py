@@ -0,0 +1,128 @@
+from sqlalchemy import event, func, select
+import asyncio
+import pytest
+from database import async_engine
+from models.model_cart import Cart_Item
+from models.model_order import Order, Order_Item
+from models.model_product import Product
+
+
+pytestmark = pytest.mark.anyio
+
+
+class StatementCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(async_engine.sync_engine, 'before_cursor_execute', self)
+        return self
+
+    def __exit__(self, *exc_info):
+        event.remove(async_engine.sync_engine, 'before_cursor_execute', self)
+
+
+async def test_get_cart_statement_count_does_not_grow_with_cart_size(client, make_user, make_category, make_products, make_cart):
+    supplier_id, _ = await make_user('supplier', is_supplier=True)
+    category_id = await make_category()
+    product_ids = await make_products(supplier_id, category_id, count=40)
+    counts = {}
+
+    for lines in (1, 40):
+        user_id, headers = await make_user(f'customer-{lines}')
+        await make_cart(user_id, {product_id: 2 for product_id in product_ids[:lines]})
+
+        with StatementCounter() as counter:
+            response = await client.get('/cart/', headers=headers)
+
+        assert response.status_code == 200
+        assert len(response.json()['Cart']) == lines
+        assert response.json()['Total'] == sum(2 * (10 + index) for index in range(lines))
+        counts[lines] = counter.count
+
+    assert counts[1] == counts[40]
+
+
+async def test_concurrent_batch_deltas_are_not_lost(client, db, make_user, make_category, make_products, make_cart):
+    supplier_id, _ = await make_user('supplier', is_supplier=True)
+    product_ids = await make_products(supplier_id, await make_category(), count=2)
+    user_id, headers = await make_user('customer')
+    await make_cart(user_id, {product_ids[0]: 1, product_ids[1]: 5})
+
+    changes = [{'product_id': product_ids[0], 'quantity': 1}, {'product_id': product_ids[1], 'quantity': -1}]
+    responses = await asyncio.gather(*(client.post('/cart/batch', headers=headers, json={'items': changes}) for _ in range(8)))
+    assert all(response.status_code == 200 for response in responses)
+
+    quantities = dict((await db.execute(select(Cart_Item.product_id, Cart_Item.quantity).where(Cart_Item.is_active == True))).all())
+    assert quantities == {product_ids[0]: 9}
+    assert await db.scalar(select(func.count()).select_from(Cart_Item).where(Cart_Item.product_id == product_ids[1], Cart_Item.quantity != 0)) == 0
+
+
+async def test_batch_replace_sets_quantities_and_returns_the_stored_cart(client, make_user, make_category, make_products, make_cart):
+    supplier_id, _ = await make_user('supplier', is_supplier=True)
+    product_ids = await make_products(supplier_id, await make_category(), count=3)
+    user_id, headers = await make_user('customer')
+    await make_cart(user_id, {product_ids[0]: 4, product_ids[1]: 2})
+
+    response = await client.post('/cart/batch', headers=headers, json={'replace': True, 'items': [
+        {'product_id': product_ids[1], 'quantity': 7},
+        {'product_id': product_ids[2], 'quantity': 1},
+    ]})
+
+    assert response.json()['cart_items'] == [{'product_id': product_ids[1], 'quantity': 7}, {'product_id': product_ids[2], 'quantity': 1}]
+    assert (await client.get('/cart/', headers=headers)).json()['Total'] == 7 * 11 + 12
+
+
+async def test_concurrent_checkouts_never_oversell(client, db, workers, make_user, make_category, make_products, make_cart):
+    processes, customers_per_process, stock = 4, 6, 5
+    supplier_id, _ = await make_user('supplier', is_supplier=True)
+    product_id, = await make_products(supplier_id, await make_category(), stock=stock)
+    request_groups = []
+
+    for process in range(processes):
+        requests = []
+        for index in range(customers_per_process):
+            user_id, headers = await make_user(f'customer-{process}-{index}')
+            await make_cart(user_id, {product_id: 1})
+            requests.append(('POST', '/cart/checkout', headers))
+        request_groups.append(requests)
+
+    responses = await workers(request_groups)
+
+    assert sorted(status_code for status_code, _ in responses) == [201] * stock + [409] * (processes * customers_per_process - stock)
+    assert await db.scalar(select(Product.stock).where(Product.id == product_id)) == 0
+    assert await db.scalar(select(func.sum(Order_Item.quantity)).where(Order_Item.product_id == product_id)) == stock
+    assert await db.scalar(select(func.count()).select_from(Order)) == stock
+
+
+async def test_concurrent_checkouts_of_one_cart_create_one_order(client, db, workers, make_user, make_category, make_products, make_cart):
+    supplier_id, _ = await make_user('supplier', is_supplier=True)
+    product_id, = await make_products(supplier_id, await make_category(), stock=10)
+    user_id, headers = await make_user('customer')
+    await make_cart(user_id, {product_id: 2})
+
+    responses = await workers([[('POST', '/cart/checkout', headers)] * 2 for _ in range(4)])
+
+    status_codes = sorted(status_code for status_code, _ in responses)
+    assert status_codes.count(201) == 1
+    assert set(status_codes) <= {201, 404, 409}
+    assert await db.scalar(select(Product.stock).where(Product.id == product_id)) == 8
+    assert await db.scalar(select(func.count()).select_from(Order)) == 1
+    assert await db.scalar(select(func.sum(Order_Item.quantity))) == 2
+
+
+async def test_concurrent_adds_of_a_new_product_share_one_cart_line(client, db, workers, make_user, make_category, make_products, make_cart):
+    supplier_id, _ = await make_user('supplier', is_supplier=True)
+    product_id, = await make_products(supplier_id, await make_category())
+    user_id, headers = await make_user('customer')
+    await make_cart(user_id, {})
+
+    add = ('POST', '/products/detail/product-0?itm_quantity=1', headers)
+    responses = await workers([[add] * 3 for _ in range(4)])
+
+    assert all(status_code == 200 for status_code, _ in responses)
+    rows = (await db.execute(select(Cart_Item.product_id, Cart_Item.quantity).where(Cart_Item.is_active == True))).all()
+    assert rows == [(product_id, 12)]
@@ -0,0 +1,104 @@
+from sqlalchemy import update
+import anyio
+import pytest
+from database import AsyncSessionLocal
+from models import model_category
+from models.model_category import Category, get_category_tree, refresh_category_tree, watch_category_tree
+
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def admin_headers(make_user):
+    _, headers = await make_user('admin', is_admin=True)
+
+    return headers
+
+
+@pytest.fixture
+async def catalog(make_user, make_category, make_products):
+    supplier_id, _ = await make_user('supplier', is_supplier=True)
+    phones_id = await make_category('Phones')
+    tablets_id = await make_category('Tablets')
+    android_id = await make_category('Android', parent_id=phones_id)
+    await make_products(supplier_id, android_id)
+
+    return phones_id, tablets_id, android_id
+
+
+async def category_names(client):
+    response = await client.get('/category/all_categories')
+    assert response.status_code == 200
+
+    return sorted(category['name'] for category in response.json())
+
+
+async def product_names(client, category_slug: str):
+    response = await client.get(f'/products/{category_slug}')
+    assert response.status_code == 200
+
+    return [product['name'] for product in response.json()['Products']]
+
+
+async def test_create_rebuilds_the_tree(client, admin_headers, catalog):
+    phones_id, _, _ = catalog
+
+    response = await client.post('/category/create', headers=admin_headers, json={'name': 'Foldables', 'parent_id': phones_id})
+
+    assert response.json()['transaction'] == 'Successful'
+    assert await category_names(client) == ['Android', 'Foldables', 'Phones', 'Tablets']
+    assert get_category_tree().by_slug['phones-foldables'].parent_id == phones_id
+
+
+async def test_update_moves_the_subtree(client, admin_headers, catalog):
+    _, tablets_id, android_id = catalog
+    assert await product_names(client, 'phones') == ['Product 0']
+
+    response = await client.put('/category/update_category', headers=admin_headers, params={'category_id': android_id}, json={'name': 'Android', 'parent_id': tablets_id})
+
+    assert response.status_code == 200
+    assert await product_names(client, 'phones') == []
+    assert await product_names(client, 'tablets') == ['Product 0']
+
+
+async def test_delete_drops_the_category(client, admin_headers, catalog):
+    _, tablets_id, _ = catalog
+
+    response = await client.delete('/category/delete', headers=admin_headers, params={'category_id': tablets_id})
+
+    assert response.status_code == 200
+    assert await category_names(client) == ['Android', 'Phones']
+
+
+async def test_refresh_picks_up_writes_from_another_worker(client, db, catalog):
+    _, tablets_id, android_id = catalog
+    category_tree = get_category_tree()
+
+    assert await refresh_category_tree(db) is category_tree
+
+    await db.execute(update(Category).where(Category.id == android_id).values(parent_id=tablets_id))
+    await db.commit()
+    assert await product_names(client, 'tablets') == []
+
+    assert await refresh_category_tree(db) is not category_tree
+    assert await product_names(client, 'tablets') == ['Product 0']
+
+
+async def test_watcher_converges_without_a_request(client, db, catalog, monkeypatch):
+    _, tablets_id, _ = catalog
+    monkeypatch.setattr(model_category, 'CATEGORY_TREE_REFRESH_SECONDS', 0.05)
+
+    async with anyio.create_task_group() as tasks:
+        tasks.start_soon(watch_category_tree, AsyncSessionLocal)
+
+        await db.execute(update(Category).where(Category.id == tablets_id).values(is_active=False))
+        await db.commit()
+
+        with anyio.fail_after(5):
+            while 'Tablets' in await category_names(client):
+                await anyio.sleep(0.05)
+
+        tasks.cancel_scope.cancel()
+
+    assert await category_names(client) == ['Android', 'Phones']
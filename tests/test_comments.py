@@ -0,0 +1,100 @@
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+import pytest
+from database import async_engine
+from models.model_cart import Cart, Cart_Item
+from models.model_product import Comment, Product, Rating
+
+
+pytestmark = pytest.mark.anyio
+
+
+class FlushFailure(RuntimeError):
+    pass
+
+
+@pytest.fixture
+def fail_after_flush():
+    listeners = []
+
+    def fail_after_flush(predicate):
+        def after_flush(session, flush_context):
+            if predicate(session):
+                raise FlushFailure('forced failure after flush')
+
+        event.listen(Session, 'after_flush', after_flush)
+        listeners.append(after_flush)
+
+    yield fail_after_flush
+
+    for listener in listeners:
+        event.remove(Session, 'after_flush', listener)
+
+
+@pytest.fixture
+def fail_statement():
+    listeners = []
+
+    def fail_statement(prefix: str):
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().startswith(prefix):
+                raise FlushFailure(f'forced failure before {prefix}')
+
+        event.listen(async_engine.sync_engine, 'before_cursor_execute', before_cursor_execute)
+        listeners.append(before_cursor_execute)
+
+    yield fail_statement
+
+    for listener in listeners:
+        event.remove(async_engine.sync_engine, 'before_cursor_execute', listener)
+
+
+@pytest.fixture
+async def catalog(make_user, make_category, make_products):
+    supplier_id, _ = await make_user('supplier', is_supplier=True)
+    customer_id, headers = await make_user('customer')
+    product_id, = await make_products(supplier_id, await make_category())
+
+    return customer_id, headers, product_id
+
+
+async def count_rows(db, model):
+    return await db.scalar(select(func.count()).select_from(model))
+
+
+async def test_create_comment_rolls_back_comment_and_rating(client, db, catalog, fail_after_flush):
+    _, headers, product_id = catalog
+    fail_after_flush(lambda session: any(isinstance(instance, Comment) for instance in session.new))
+
+    response = await client.post('/products/detail/product-0/comment', headers=headers, json={'create_comment': {'comment': 'Great'}, 'create_rating': {'rating': 5}})
+
+    assert 'forced failure' in response.json()['error']
+    assert await count_rows(db, Comment) == 0
+    assert await count_rows(db, Rating) == 0
+    assert (await db.execute(select(Product.rating_sum, Product.rating_count).where(Product.id == product_id))).one() == (0, 0)
+
+
+async def test_delete_comment_keeps_comment_rating_and_counters_together(client, db, catalog, fail_after_flush):
+    _, headers, product_id = catalog
+    response = await client.post('/products/detail/product-0/comment', headers=headers, json={'create_comment': {'comment': 'Great'}, 'create_rating': {'rating': 4}})
+    assert response.json()['transaction'] == 'Successful'
+    comment_id = await db.scalar(select(Comment.id))
+
+    fail_after_flush(lambda session: any(isinstance(instance, Rating) for instance in session.dirty))
+    with pytest.raises(FlushFailure):
+        await client.delete('/products/comment/delete', headers=headers, params={'comment_id': comment_id})
+
+    assert await db.scalar(select(Comment.is_active).where(Comment.id == comment_id)) is True
+    assert await db.scalar(select(Rating.is_active).where(Rating.comment_id == comment_id)) is True
+    assert (await db.execute(select(Product.rating_sum, Product.rating_count).where(Product.id == product_id))).one() == (4, 1)
+
+
+async def test_add_cart_does_not_leave_an_empty_cart(client, db, catalog, fail_statement):
+    _, headers, _ = catalog
+    fail_statement('INSERT INTO cart_items')
+
+    with pytest.raises(FlushFailure):
+        await client.post('/products/detail/product-0', headers=headers, params={'itm_quantity': 1})
+
+    assert await count_rows(db, Cart) == 0
+    assert await count_rows(db, Cart_Item) == 0
@@ -0,0 +1,19 @@
+import pytest
+from benchmarks.explain import analyze, build_checks, failed_checks, run_checks
+from benchmarks.seed import SeedConfig, mint_tokens, seed_database
+from database import AsyncSessionLocal, engine
+from models.model_category import load_category_tree
+
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_hot_queries_are_planned_with_the_hot_path_indexes(client):
+    data = seed_database(engine, SeedConfig(customers=50, suppliers=5, products=2000, carts=20))
+    analyze(engine)
+    async with AsyncSessionLocal() as db:
+        await load_category_tree(db)
+
+    results = await run_checks(client, build_checks(data), mint_tokens(data))
+
+    assert failed_checks(results) == [], [(check.name, plans) for check, _, plans in results]
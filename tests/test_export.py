@@ -0,0 +1,80 @@
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import event
+import json
+import pytest
+from database import async_engine
+
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def non_utc_sessions(client):
+    def set_time_zone(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("SET TIME ZONE 'Pacific/Auckland'")
+        cursor.close()
+
+    if async_engine.dialect.name == 'postgresql':
+        event.listen(async_engine.sync_engine, 'connect', set_time_zone)
+        await async_engine.dispose()
+
+    yield
+
+    if async_engine.dialect.name == 'postgresql':
+        event.remove(async_engine.sync_engine, 'connect', set_time_zone)
+
+
+@pytest.fixture
+async def catalog(make_user, make_category, make_products):
+    supplier_id, _ = await make_user('supplier', is_supplier=True)
+    customer_id, headers = await make_user('customer')
+    _, admin_headers = await make_user('admin', is_admin=True)
+    await make_products(supplier_id, await make_category(), count=3)
+
+    return customer_id, headers, admin_headers
+
+
+async def export(client, headers, model_name: str, updated_since: datetime):
+    response = await client.get(f'/export/{model_name}', headers=headers, params={'updated_since': updated_since.isoformat()})
+    assert response.status_code == 200
+
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+async def test_updated_since_with_an_offset_is_compared_in_utc(client, catalog):
+    _, _, admin_headers = catalog
+    an_hour_ago = datetime.now(timezone.utc) - timedelta(hours=1)
+
+    rows = await export(client, admin_headers, 'products', an_hour_ago.astimezone(timezone(timedelta(hours=5))))
+
+    assert [row['id'] for row in rows] == [1, 2, 3]
+
+
+async def test_soft_deletes_are_exported_as_updates(client, catalog, make_cart):
+    customer_id, headers, admin_headers = catalog
+    await make_cart(customer_id, {1: 2})
+    await client.post('/products/detail/product-0/comment', headers=headers, json={'create_comment': {'comment': 'Great'}, 'create_rating': {'rating': 5}})
+    cutoff = datetime.now(timezone.utc)
+
+    assert await export(client, admin_headers, 'comments', cutoff) == []
+    assert await export(client, admin_headers, 'ratings', cutoff) == []
+    assert await export(client, admin_headers, 'cart_items', cutoff) == []
+
+    await client.delete('/products/comment/delete', headers=headers, params={'comment_id': 1})
+    await client.delete('/cart/delete', headers=headers, params={'itm_id': 1})
+
+    for model_name in ('comments', 'ratings', 'cart_items'):
+        rows = await export(client, admin_headers, model_name, cutoff)
+        assert [(row['id'], row['is_active']) for row in rows] == [(1, False)]
+
+
+async def test_server_timestamps_are_utc_whatever_the_session_time_zone(client, non_utc_sessions, catalog):
+    _, _, admin_headers = catalog
+    now = datetime.now(timezone.utc)
+
+    rows = await export(client, admin_headers, 'products', now - timedelta(minutes=1))
+
+    assert [row['id'] for row in rows] == [1, 2, 3]
+    for row in rows:
+        assert abs(datetime.fromisoformat(row['created_at']).replace(tzinfo=timezone.utc) - now) < timedelta(minutes=1)
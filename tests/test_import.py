@@ -0,0 +1,65 @@
+from sqlalchemy import select
+import json
+import pytest
+from models.model_product import Product
+
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def supplier(make_user, make_category):
+    _, headers = await make_user('supplier', is_supplier=True)
+    category_id = await make_category()
+
+    return headers, category_id
+
+
+async def import_products(client, headers, content: str, content_type: str):
+    return (await client.post('/products/import', headers={**headers, 'Content-Type': content_type}, content=content.encode())).json()
+
+
+async def test_csv_import_keeps_quoted_newlines_commas_and_quotes(client, db, supplier):
+    headers, category_id = supplier
+    content = (
+        'name,description,price,image_url,stock,category\r\n'
+        f'Phone,"Line one\r\nline two, with a comma\r\n\r\nand ""quotes""",100,https://example.com/1.jpg,5,{category_id}\r\n'
+        f'Laptop,Plain,200,https://example.com/2.jpg,3,{category_id}\r\n'
+    )
+
+    result = await import_products(client, headers, content, 'text/csv')
+
+    assert (result['Imported'], result['Failed']) == (2, 0)
+    descriptions = dict((await db.execute(select(Product.name, Product.description))).all())
+    assert descriptions == {'Phone': 'Line one\nline two, with a comma\n\nand "quotes"', 'Laptop': 'Plain'}
+
+
+async def test_csv_import_reports_errors_by_starting_line(client, db, supplier):
+    headers, category_id = supplier
+    content = (
+        'name,description,price,image_url,stock,category\n'
+        f'Phone,"Multi\nline",100,https://example.com/1.jpg,5,{category_id}\n'
+        f'Laptop,"Also\nmulti\nline",not-a-price,https://example.com/2.jpg,3,{category_id}\n'
+        '\n'
+        f'Camera,"Never closed,300,https://example.com/3.jpg,1,{category_id}\n'
+        f'Tablet,Fine,400,https://example.com/4.jpg,1,{category_id}\n'
+    )
+
+    result = await import_products(client, headers, content, 'text/csv')
+
+    assert result['Imported'] == 1
+    assert [error['row'] for error in result['Errors']] == [4, 8]
+    assert 'price' in result['Errors'][0]['error']
+    assert result['Errors'][1]['error'] == 'Unterminated quoted field'
+
+
+async def test_ndjson_import(client, db, supplier):
+    headers, category_id = supplier
+    rows = [{'name': f'Item {index}', 'description': 'Line\nbreak', 'price': 10, 'image_url': 'https://example.com/i.jpg', 'stock': 1, 'category': category_id} for index in range(3)]
+    content = '\n'.join(json.dumps(row) for row in rows) + '\n{not json}\n'
+
+    result = await import_products(client, headers, content, 'application/x-ndjson')
+
+    assert (result['Imported'], result['Failed']) == (3, 1)
+    assert result['Errors'][0]['row'] == 4
+    assert set((await db.scalars(select(Product.slug))).all()) == {'item-0', 'item-1', 'item-2'}
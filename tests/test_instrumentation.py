@@ -0,0 +1,79 @@
+import pytest
+import instrumentation
+from instrumentation import fingerprint, parse_route_budgets
+
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def cart(make_user, make_category, make_products, make_cart):
+    supplier_id, _ = await make_user('supplier', is_supplier=True)
+    product_ids = await make_products(supplier_id, await make_category(), count=3)
+    user_id, headers = await make_user('customer')
+    await make_cart(user_id, {product_id: 1 for product_id in product_ids})
+
+    return headers
+
+
+def test_fingerprint_collapses_literals_and_in_lists():
+    assert fingerprint("SELECT * FROM products WHERE id IN (?, ?, ?) AND name = 'it''s'  AND price > 10") == 'SELECT * FROM products WHERE id IN (?) AND name = ? AND price > ?'
+    assert fingerprint('UPDATE products SET stock=(products.stock - $1) WHERE products.id = $2') == fingerprint('UPDATE products SET stock=(products.stock - $3) WHERE products.id = $4')
+
+
+def test_route_budgets_are_parsed_from_the_environment_format():
+    assert parse_route_budgets('GET /cart/=2, GET /products/{category_slug}=3,') == {'GET /cart/': 2, 'GET /products/{category_slug}': 3}
+
+
+async def test_debug_headers_report_statements_and_time(client, cart):
+    response = await client.get('/cart/', headers=cart)
+
+    assert response.headers['X-SQL-Count'] == '1'
+    assert float(response.headers['X-SQL-Time-Ms']) > 0
+    assert response.headers['X-SQL-Repeated'] == '0'
+    assert 'X-SQL-Budget-Exceeded' not in response.headers
+
+
+async def test_repeated_statements_are_detected_per_request_and_route(client, cart):
+    response = await client.post('/cart/checkout', headers=cart)
+
+    assert response.status_code == 201
+    assert response.headers['X-SQL-Repeated'] == '3'
+
+    route = (await client.get('/metrics/')).json()['sql']['routes']['POST /cart/checkout']
+    assert route['requests'] == 1
+    assert route['repeated_statements'] == 1
+    assert route['max_statements'] == int(response.headers['X-SQL-Count'])
+
+
+async def test_route_histograms_accumulate_requests(client, cart):
+    for _ in range(3):
+        await client.get('/cart/', headers=cart)
+
+    route = (await client.get('/metrics/')).json()['sql']['routes']['GET /cart/']
+    assert route['requests'] == 3
+    assert route['statements_histogram']['le_1'] == 3
+    assert route['statements_histogram']['le_+Inf'] == 3
+    assert route['db_time_ms_histogram']['le_+Inf'] == 3
+
+
+async def test_strict_budget_fails_the_request(client, cart, query_budget):
+    query_budget('POST /cart/checkout', 4)
+
+    response = await client.post('/cart/checkout', headers=cart)
+
+    assert response.status_code == 500
+    assert response.json()['detail'].startswith('Query budget exceeded: POST /cart/checkout ran ')
+    assert (await client.get('/metrics/')).json()['sql']['routes']['POST /cart/checkout']['over_budget'] == 1
+
+
+async def test_lenient_budget_only_flags_the_response(client, cart, query_budget, monkeypatch):
+    monkeypatch.setattr(instrumentation, 'SQL_QUERY_BUDGET_STRICT', False)
+    query_budget('GET /cart/', 0)
+    query_budget('POST /cart/checkout', 4)
+
+    response = await client.post('/cart/checkout', headers=cart)
+
+    assert response.status_code == 201
+    assert response.headers['X-SQL-Budget-Exceeded'] == '4'
+    assert 'X-SQL-Budget-Exceeded' not in (await client.get('/cart/', headers=cart)).headers
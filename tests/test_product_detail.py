@@ -0,0 +1,93 @@
+from sqlalchemy import insert, select, update
+import pytest
+import shutil
+import database
+from cache import RESPONSE_CACHE_TTL
+from database import create_pooled_engine, engine, get_async_database_url
+from models.model_product import Comment, Product
+from routers.product import product_detail_key
+
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def product(make_user, make_category, make_products):
+    supplier_id, _ = await make_user('supplier', is_supplier=True)
+    _, headers = await make_user('customer')
+    await make_products(supplier_id, await make_category())
+
+    return headers
+
+
+async def test_comment_pages_include_comments_sharing_a_timestamp(client, db, product):
+    await db.execute(insert(Comment).values([
+        {'product_id': 1, 'user_id': 2, 'comment': f'Comment {index}', 'is_active': True}
+        for index in range(6)
+    ]))
+    await db.commit()
+    assert len(set((await db.scalars(select(Comment.post_date))).all())) == 1
+
+    comment_ids = []
+    params = {'comments_limit': 2}
+    while True:
+        page = (await client.get('/products/detail/product-0', params=params)).json()
+        comment_ids += [comment['id'] for comment in page['Comments']]
+
+        if page['Next'] is None:
+            break
+        params['comments_after'] = page['Next']
+
+    assert comment_ids == list(range(1, 7))
+
+
+async def test_detail_is_cached_in_redis_and_revalidated_with_etag(client, product, fake_redis):
+    response = await client.get('/products/detail/product-0')
+    etag = response.headers['etag']
+
+    assert response.status_code == 200
+    assert response.json()['Product']['slug'] == 'product-0'
+    assert fake_redis.values[product_detail_key('product-0')][0].startswith(etag.encode() + b'\n')
+
+    response = await client.get('/products/detail/product-0', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.headers['etag'] == etag
+    assert response.content == b''
+
+
+async def test_redis_entry_is_invalidated_on_write_and_expires(client, product, fake_redis):
+    etag = (await client.get('/products/detail/product-0')).headers['etag']
+
+    await client.post('/products/detail/product-0/comment', headers=product, json={'create_comment': {'comment': 'Great'}, 'create_rating': {'rating': 5}})
+    assert product_detail_key('product-0') not in fake_redis.values
+
+    response = await client.get('/products/detail/product-0', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['etag'] != etag
+    assert response.json()['Comments'][0]['comment'] == 'Great'
+
+    fake_redis.now += RESPONSE_CACHE_TTL
+    assert await fake_redis.get(product_detail_key('product-0')) is None
+    assert (await client.get('/products/detail/product-0')).status_code == 200
+    assert product_detail_key('product-0') in fake_redis.values
+
+
+async def test_replica_reads_are_served_but_not_cached(client, db, product, fake_redis, monkeypatch, tmp_path):
+    replica_path = tmp_path / 'replica.db'
+    shutil.copyfile(engine.url.database, replica_path)
+    replica = create_pooled_engine(get_async_database_url(f'sqlite:///{replica_path}'))
+    monkeypatch.setattr(database, 'read_replicas', database.ReplicaSet([replica], database.REPLICA_RETRY_SECONDS))
+
+    await db.execute(update(Product).where(Product.slug == 'product-0').values(price=99))
+    await db.commit()
+
+    response = await client.get('/products/detail/product-0')
+    assert response.json()['Product']['price'] == 10
+    assert product_detail_key('product-0') not in fake_redis.values
+
+    client.cookies.set(database.READ_PRIMARY_COOKIE, '1')
+    response = await client.get('/products/detail/product-0')
+    assert response.json()['Product']['price'] == 99
+    assert product_detail_key('product-0') in fake_redis.values
+
+    await replica.dispose()
@@ -0,0 +1,27 @@
+import pytest
+from models.model_product import Product
+
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def catalog(make_user, make_category, make_products):
+    supplier_id, _ = await make_user('supplier', is_supplier=True)
+    await make_products(supplier_id, await make_category(), count=3)
+
+
+async def test_field_projection_returns_only_requested_fields(client, catalog):
+    response = await client.get('/products/', params={'fields': 'name,price', 'limit': 2})
+
+    assert response.json() == {
+        'Products': [{'id': 1, 'name': 'Product 0', 'price': 10}, {'id': 2, 'name': 'Product 1', 'price': 11}],
+        'Next': 2,
+    }
+
+
+async def test_full_rows_include_every_column(client, catalog):
+    products = (await client.get('/products/')).json()['Products']
+
+    assert [product['slug'] for product in products] == ['product-0', 'product-1', 'product-2']
+    assert all(set(product) == {column.name for column in Product.__table__.columns} for product in products)
@@ -0,0 +1,48 @@
+from sqlalchemy import text
+import pytest
+from database import Base, engine
+
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def catalog(make_user, make_category, make_products):
+    supplier_id, _ = await make_user('supplier', is_supplier=True)
+    category_id = await make_category()
+    await make_products(supplier_id, category_id, count=3, name='Phone')
+    await make_products(supplier_id, category_id, count=2, name='Laptop')
+
+
+async def test_search_ranks_matching_products(client, catalog):
+    response = await client.get('/products/search', params={'q': 'laptop'})
+
+    assert response.status_code == 200
+    assert sorted(product['slug'] for product in response.json()['Products']) == ['laptop-0', 'laptop-1']
+    assert response.json()['Total'] == 2
+
+
+@pytest.mark.parametrize('q', [' ', '   ', '\t'])
+async def test_blank_search_is_rejected(client, catalog, q):
+    response = await client.get('/products/search', params={'q': q})
+
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize('q', ['phone OR laptop', 'NEAR(phone laptop)', 'name:phone', 'phone*', '"phone', 'phone"', '-phone', '^phone', '(phone', 'AND'])
+async def test_search_operators_are_matched_literally(client, catalog, q):
+    response = await client.get('/products/search', params={'q': q})
+
+    assert response.status_code == 200
+    assert response.json()['Total'] == 0 or all('phone' in product['slug'] for product in response.json()['Products'])
+
+
+async def test_search_index_is_backfilled_for_an_existing_database(client, catalog):
+    with engine.begin() as connection:
+        connection.execute(text('DROP TABLE products_fts'))
+        connection.execute(text('DROP TRIGGER IF EXISTS products_fts_insert'))
+
+    Base.metadata.create_all(engine)
+
+    response = await client.get('/products/search', params={'q': 'phone'})
+    assert response.json()['Total'] == 3
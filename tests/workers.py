@@ -0,0 +1,26 @@
+import asyncio
+import os
+import traceback
+
+
+def run_worker(environment: dict, barrier, results, requests: list):
+    os.environ.clear()
+    os.environ.update(environment)
+
+    try:
+        results.put(('ok', asyncio.run(send_requests(barrier, requests))))
+    except Exception:
+        results.put(('error', traceback.format_exc()))
+
+
+async def send_requests(barrier, requests: list):
+    import httpx
+    import main
+
+    async with main.app.router.lifespan_context(main.app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url='http://worker') as client:
+            await client.get('/products/')
+            barrier.wait()
+            responses = await asyncio.gather(*(client.request(method, path, headers=headers) for method, path, headers in requests))
+
+    return [(response.status_code, response.json()) for response in responses]